@@ -8,9 +8,13 @@ from onboarding import (
     init_daily_mood_table, init_weekly_availability_table,
 )
 from cursos import get_all_courses
+from planes import (
+    init_plans_table, input_hash, save_plan,
+    get_plan_for_inputs, get_latest_plan, get_latest_plans, get_plan_history,
+    init_calendar_table, get_calendar_state, save_calendar_state,
+)
 from datetime import date
 import sys
-import base64
 from pathlib import Path
 
 import streamlit as st
@@ -18,7 +22,11 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
-from backend.planificador import generar_plan_y_ics_multimodal
+from backend.replanificador import replanificar
+from backend.gen_calendar import generar_ics_desde_plan, exportar_ics
+from backend.modelos import PlanEstudio
+from feed_ics import init_feed_tokens_table, start_feed_server, get_feed_token, feed_url
+from jobs import init_jobs_table, enqueue_plan_job, get_active_job, get_latest_job, get_user_jobs
 
 # --------- setup inicial ----------
 st.set_page_config(page_title="SmartSemester – Demo login", page_icon="📚")
@@ -97,6 +105,11 @@ init_onboarding_table()
 
 init_daily_mood_table()
 init_weekly_availability_table()
+init_plans_table()
+init_calendar_table()
+init_jobs_table()
+init_feed_tokens_table()
+start_feed_server()
 
 # Estado global de sesión
 if "user" not in st.session_state:
@@ -109,8 +122,6 @@ if "screen" not in st.session_state:
 # --------- helpers de UI ----------
 def _archivo_a_entrada(uploaded_file, tipo_sugerido=None):
     ext = uploaded_file.name.split(".")[-1].lower()
-    data = uploaded_file.getvalue()
-    b64 = base64.b64encode(data).decode("utf-8")
     if ext == "pdf":
         formato = "pdf"
     elif ext in ("png", "jpg", "jpeg"):
@@ -121,7 +132,9 @@ def _archivo_a_entrada(uploaded_file, tipo_sugerido=None):
         "tipo": tipo_sugerido,
         "formato": formato,
         "nombre": uploaded_file.name,
-        "contenido_base64": b64,
+        # Vista sobre el buffer del archivo subido (sin copiarlo ni pasar por
+        # base64): extracción y input_hash aceptan memoryview
+        "contenido": uploaded_file.getbuffer(),
     }
 
 
@@ -157,6 +170,20 @@ def _dias_a_bloques(disponibilidad_str: str):
         bloques.append({"dia": dd, "inicio": "19:00", "fin": "21:00"})
     return bloques
 
+
+def _payload_para_ramo(code, onboard, uploaded_files):
+    onboard = dict(onboard)
+    disponibilidad_str = onboard.get("availability") or ""
+    mood_base = onboard.get("mood") or "Bien"
+    return {
+        "curso": {"nombre": code, "codigo": code},
+        "semestre": {},  # backend completa si detecta fechas
+        "disponibilidad": {"zona_horaria": "America/Santiago", "bloques": _dias_a_bloques(disponibilidad_str)},
+        "evaluaciones_conocidas": [],
+        "estado_animo": _mood_a_estado_animo(mood_base),
+        "entradas": [_archivo_a_entrada(f) for f in uploaded_files],
+    }
+
 def plan_a_parrafos_simple(plan):
     if not plan:
         return "No hay plan disponible."
@@ -201,6 +228,118 @@ def plan_a_parrafos_simple(plan):
     return "\n\n".join(out)
 
 
+def _replanificar_planes(evento):
+    """
+    Ajusta la última versión guardada del plan de cada ramo al nuevo ánimo
+    o disponibilidad, sin volver a llamar a la IA, y la guarda como versión
+    nueva. Los ramos que ya están abiertos en la sesión se actualizan también.
+    """
+    user_id = st.session_state["user"]["id"]
+    resumen = []
+    for guardado in get_latest_plans(user_id):
+        code = guardado["course_code"]
+        plan = PlanEstudio.model_validate_json(guardado["plan_json"])
+        nuevo, diff = replanificar(plan, evento)
+        if not diff.cambios:
+            continue
+        ics_str = generar_ics_desde_plan(nuevo)
+        version = save_plan(user_id, code, nuevo.model_dump_json(), ics_str)
+        if isinstance(st.session_state.get(f"plan_{code}"), PlanEstudio):
+            st.session_state[f"plan_{code}"] = nuevo
+            st.session_state[f"ics_{code}"] = ics_str
+            st.session_state[f"plan_version_{code}"] = version
+        resumen.append(f"{code}: {len(diff.cambios)} sesión(es) ajustada(s)")
+    st.session_state["ultimo_replan"] = resumen
+
+
+def _cargar_plan_guardado(code, guardado):
+    """Pasa un plan leído de la base (get_latest_plan / get_plan_for_inputs) a la sesión."""
+    st.session_state[f"plan_{code}"] = PlanEstudio.model_validate_json(guardado["plan_json"])
+    st.session_state[f"ics_{code}"] = guardado["ics"]
+    st.session_state[f"plan_version_{code}"] = guardado["version"]
+
+
+def _encolar_plan(user_id, code, payload):
+    """
+    Reutiliza el plan guardado si las entradas no cambiaron; si no, encola
+    su generación. Devuelve la versión reutilizada o None si quedó en cola.
+    """
+    hash_entradas = input_hash(payload)
+    guardado = get_plan_for_inputs(user_id, code, hash_entradas) if payload.get("usar_cache", True) else None
+    if guardado:
+        _cargar_plan_guardado(code, guardado)
+        return guardado["version"]
+    enqueue_plan_job(user_id, code, payload, hash_entradas)
+    return None
+
+
+@st.fragment(run_every=2)
+def _seguir_trabajo(user_id, code):
+    """Muestra el avance del trabajo del ramo; al terminar carga el plan y recarga la página."""
+    job = get_latest_job(user_id, code)
+    if job is None or job["id"] == st.session_state.get(f"job_visto_{code}"):
+        return
+    if job["status"] in ("queued", "running"):
+        st.progress(job["progress"], text=job["stage"] or "En cola")
+        if job["partial"]:
+            st.markdown("\n\n".join(
+                f"#### Semana {semana.get('numero')}\n\n" + plan_a_parrafos_simple(semana.get("sesiones", []))
+                for semana in job["partial"]
+            ))
+        return
+    st.session_state[f"job_visto_{code}"] = job["id"]
+    if job["status"] == "done":
+        _cargar_plan_guardado(code, get_latest_plan(user_id, code, version=job["plan_version"]))
+        st.session_state[f"job_msg_{code}"] = ("success", "Plan generado! ✅")
+    else:
+        st.session_state[f"job_msg_{code}"] = ("error", f"Falló la generación del plan: {job['error']}")
+    st.rerun()
+
+
+@st.fragment(run_every=2)
+def _panel_trabajos(user_id):
+    trabajos = get_user_jobs(user_id)
+    activos = [t for t in trabajos if t["status"] in ("queued", "running")]
+    if not activos:
+        st.rerun()
+    for t in activos:
+        st.progress(t["progress"], text=f"{t['course_code']}: {t['stage'] or 'En cola'}")
+
+
+def _descargas_calendario(user_id, scope, planes, file_name, prefijo_curso=False):
+    """
+    Botones para bajar el calendario completo o solo lo que cambió desde la
+    última descarga (mismos UID, SEQUENCE mayor, cancelados incluidos).
+    El estado se guarda al descargar.
+    """
+    anterior = get_calendar_state(user_id, scope)
+    completo, estado, cambios = exportar_ics(planes, anterior, prefijo_curso=prefijo_curso)
+    st.download_button(
+        label="📅 Descargar calendario completo (.ics)",
+        data=completo,
+        file_name=file_name,
+        mime="text/calendar",
+        key=f"dl_{scope}",
+        on_click=save_calendar_state,
+        args=(user_id, scope, estado),
+    )
+    if not anterior:
+        return
+    if not cambios:
+        st.caption("Sin cambios desde tu última descarga.")
+        return
+    solo_cambios, _, _ = exportar_ics(planes, anterior, solo_cambios=True, prefijo_curso=prefijo_curso)
+    st.download_button(
+        label=f"🔁 Descargar solo los cambios ({cambios} evento(s))",
+        data=solo_cambios,
+        file_name=file_name.replace(".ics", "_cambios.ics"),
+        mime="text/calendar",
+        key=f"dl_cambios_{scope}",
+        on_click=save_calendar_state,
+        args=(user_id, scope, estado),
+    )
+
+
 def go_to(screen_name: str):
     st.session_state["screen"] = screen_name
 
@@ -267,6 +406,10 @@ with st.sidebar:
                             st.warning("Selecciona al menos un día 🤓")
                         else:
                             update_availability(user["id"], ",".join(nueva_disponibilidad))
+                            _replanificar_planes({
+                                "tipo": "disponibilidad",
+                                "bloques": _dias_a_bloques(",".join(nueva_disponibilidad)),
+                            })
                             st.success("Disponibilidad actualizada ✅")
                             st.session_state["sidebar_edit_avail"] = False
                             st.rerun()
@@ -298,9 +441,17 @@ with st.sidebar:
             if st.button("Guardar mood de hoy", key="sidebar_mood_btn"):
                 save_daily_mood(user["id"], mood_hoy)
                 update_mood(user["id"], mood_hoy)
+                _replanificar_planes({
+                    "tipo": "estado_animo",
+                    "estado_animo": _mood_a_estado_animo(mood_hoy),
+                    "bloques": _dias_a_bloques(disponibilidad),
+                })
                 st.success("Mood guardado 😊")
                 st.rerun()
 
+            for linea in st.session_state.pop("ultimo_replan", []):
+                st.caption(f"🔁 Plan {linea}")
+
             st.markdown("</div>", unsafe_allow_html=True)
 
         else:
@@ -478,11 +629,86 @@ def dashboard():
                 st.write("- Próximas sesiones sugeridas")
                 st.write("- Archivos / apuntes asociados al ramo")
 
-                if st.button(f"Ver plan para {code}", key=f"plan_{code}"):
+                if st.button(f"Ver plan para {code}", key=f"ver_plan_{code}"):
                     st.session_state["current_course"] = code
                     st.session_state["screen"] = "course"
                     st.rerun()
 
+    st.markdown("---")
+    st.subheader("📅 Calendario del semestre")
+    planes_semestre, sin_plan = [], []
+    for code in ramos:
+        plan = st.session_state.get(f"plan_{code}")
+        if not isinstance(plan, PlanEstudio):
+            guardado = get_latest_plan(user_id, code)
+            plan = PlanEstudio.model_validate_json(guardado["plan_json"]) if guardado else None
+        if plan is None:
+            sin_plan.append(code)
+        else:
+            planes_semestre.append(plan)
+    if planes_semestre:
+        st.caption("Todos tus ramos en un solo archivo: se importa una vez en vez de un .ics por ramo.")
+        _descargas_calendario(user_id, "semestre", planes_semestre, "plan_semestre.ics", prefijo_curso=True)
+        if sin_plan:
+            st.caption(f"Sin plan todavía: {', '.join(sin_plan)}")
+    else:
+        st.info("Genera el plan de al menos un ramo para exportar el calendario del semestre.")
+
+    if planes_semestre and start_feed_server():
+        with st.expander("🔗 Suscribirse desde tu app de calendario"):
+            st.caption(
+                "Agrega esta URL como calendario por suscripción (Google Calendar, Outlook, Apple). "
+                "Se actualiza sola cada vez que cambia un plan."
+            )
+            token = get_feed_token(user_id)
+            st.code(feed_url(token), language=None)
+            for code in ramos:
+                if code not in sin_plan:
+                    st.caption(f"Solo {code}:")
+                    st.code(feed_url(token, code), language=None)
+            if st.button("Generar un enlace nuevo (invalida el anterior)", key="renovar_feed"):
+                get_feed_token(user_id, renew=True)
+                st.rerun()
+
+    st.markdown("---")
+    with st.expander("⚡ Generar planes para todos mis ramos"):
+        st.caption("Sube el material de cada ramo y se generan todos los planes a la vez.")
+        archivos_por_ramo = {}
+        for code in ramos:
+            archivos_por_ramo[code] = st.file_uploader(
+                f"Material de {code}",
+                type=["pdf", "png", "jpg", "jpeg", "txt"],
+                accept_multiple_files=True,
+                key=f"lote_{code}",
+            )
+
+        listos = {code: files for code, files in archivos_por_ramo.items() if files}
+        if not _dias_a_bloques(disponibilidad):
+            st.warning("Tu disponibilidad esta vacía. Edita tus días en el onboarding.")
+        elif st.button("🎯 Generar todos los planes", key="gen_lote", disabled=not listos):
+            encolados = 0
+            for code, files in listos.items():
+                version = _encolar_plan(user_id, code, _payload_para_ramo(code, data, files))
+                if version:
+                    st.success(f"{code}: mismo material que la versión {version}, se reutiliza ✅")
+                else:
+                    encolados += 1
+            if encolados:
+                st.info(f"{encolados} plan(es) en cola.")
+
+    trabajos = get_user_jobs(user_id)
+    if any(t["status"] in ("queued", "running") for t in trabajos):
+        st.markdown("### ⏳ Planes en preparación")
+        st.caption("Puedes seguir usando la app; los planes quedan guardados al terminar.")
+        _panel_trabajos(user_id)
+    elif trabajos:
+        with st.expander("🗂️ Últimas generaciones"):
+            for t in trabajos:
+                if t["status"] == "done":
+                    st.write(f"✅ {t['course_code']}: versión {t['plan_version']} ({t['updated_at'].replace('T', ' ')})")
+                else:
+                    st.write(f"⚠️ {t['course_code']}: {t['error']}")
+
 def edit_user_screen():
     user = st.session_state["user"]
     st.header("Editar usuario")
@@ -540,17 +766,21 @@ def course_detail_screen():
         st.warning("No encontro tu onboarding. Vuelve a configurarlo.")
         return
 
-    onboard = dict(onboard)
-    disponibilidad_str = onboard.get("availability") or ""
-    mood_base = onboard.get("mood") or "Bien"
-
-    estado_animo = _mood_a_estado_animo(mood_base)
-    bloques = _dias_a_bloques(disponibilidad_str)
+    bloques = _dias_a_bloques(onboard["availability"] or "")
 
     if not bloques:
         st.warning("Tu disponibilidad esta vacía. Edita tus días en el onboarding.")
         return
     
+    # El último plan guardado del ramo se carga al entrar, sin generar nada
+    if f"plan_{code}" not in st.session_state:
+        guardado = get_latest_plan(user_id, code)
+        if guardado:
+            _cargar_plan_guardado(code, guardado)
+        ultimo = get_latest_job(user_id, code)
+        if ultimo and ultimo["status"] not in ("queued", "running"):
+            st.session_state[f"job_visto_{code}"] = ultimo["id"]
+
     uploaded_files = st.file_uploader(
     "📎 Sube programa, guías o apuntes del ramo",
     type=["pdf", "png", "jpg", "jpeg", "txt"],
@@ -559,31 +789,49 @@ def course_detail_screen():
 
     if not uploaded_files:
         st.info("Sube al menos un archivo para generar un plan real.")
-        return
+    else:
+        payload = _payload_para_ramo(code, onboard, uploaded_files)
 
-    entradas = [_archivo_a_entrada(f) for f in uploaded_files]
+        payload["usar_cache"] = not st.checkbox(
+            "Forzar nueva generación (ignorar respuestas guardadas)",
+            key=f"sin_cache_{code}",
+        )
 
-    payload = {
-        "curso": {"nombre": code, "codigo": code},
-        "semestre": {},  # backend completa si detecta fechas
-        "disponibilidad": {"zona_horaria": "America/Santiago", "bloques": bloques},
-        "evaluaciones_conocidas": [],
-        "estado_animo": estado_animo,
-        "entradas": entradas,
-    }
+        activo = get_active_job(user_id, code)
+        if st.button("🎯 Generar plan con IA", key=f"gen_real_{code}", disabled=activo is not None):
+            version = _encolar_plan(user_id, code, payload)
+            if version:
+                # Mismo material, disponibilidad y ánimo: se reutiliza el plan guardado
+                st.success(f"Plan recuperado (versión {version}) ✅")
+            else:
+                st.rerun()
 
-    if st.button("🎯 Generar plan con IA", key=f"gen_real_{code}"):
-        with st.spinner("Generando plan y calendario..."):
-            try:
-                plan, ics_str = generar_plan_y_ics_multimodal(payload)
-                st.session_state[f"plan_{code}"] = plan
-                st.session_state[f"ics_{code}"] = ics_str
-                st.success("Plan generado! ✅")
-            except Exception as e:
-                st.error(f"Falló la generación del plan: {e}")
+    # La generación corre en segundo plano; aquí solo se consulta su avance
+    mensaje = st.session_state.pop(f"job_msg_{code}", None)
+    if mensaje:
+        getattr(st, mensaje[0])(mensaje[1])
+    ultimo = get_latest_job(user_id, code)
+    if ultimo and ultimo["id"] != st.session_state.get(f"job_visto_{code}"):
+        _seguir_trabajo(user_id, code)
+
+    historial = get_plan_history(user_id, code)
+    if len(historial) > 1:
+        with st.expander(f"🕘 Versiones anteriores ({len(historial)})"):
+            opciones = {
+                f"v{h['version']} · {h['created_at'].replace('T', ' ')}"
+                + ("" if h["input_hash"] else " · reajuste"): h["version"]
+                for h in historial
+            }
+            elegida = st.selectbox("Versión", list(opciones), key=f"version_sel_{code}")
+            if st.button("Cargar esta versión", key=f"cargar_version_{code}"):
+                _cargar_plan_guardado(code, get_latest_plan(user_id, code, version=opciones[elegida]))
+                st.rerun()
+
+    version_actual = st.session_state.get(f"plan_version_{code}")
+    if version_actual:
+        st.caption(f"Mostrando la versión {version_actual} del plan.")
 
     plan_obj = st.session_state.get(f"plan_{code}")
-    ics_guardado = st.session_state.get(f"ics_{code}")
 
     try:
         data_plan = plan_obj.model_dump()
@@ -601,14 +849,8 @@ def course_detail_screen():
     # Sección 3: descarga calendario real
     st.subheader("3️⃣ Exportar a calendario (real)")
 
-    if ics_guardado:
-        st.download_button(
-            label="📅 Descargar plan en .ics",
-            data=ics_guardado,
-            file_name=f"plan_{code}.ics",
-            mime="text/calendar",
-            key=f"dl_{code}",
-        )
+    if isinstance(plan_obj, PlanEstudio):
+        _descargas_calendario(user_id, code, [plan_obj], f"plan_{code}.ics")
     else:
         st.info("Primero genera el plan para habilitar el .ics.")
 
@@ -1,18 +1,8 @@
-from pathlib import Path
-import sqlite3
-
-DB_PATH = Path(__file__).resolve().parent / "ramos_uc.db"
-
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+from db import connection
 
 def get_courses_by_codes(codes):
     if not codes:
         return []
-    conn = get_connection()
-    cur = conn.cursor()
     placeholders = ",".join(["?"] * len(codes))
     query = f"""
         SELECT code
@@ -20,20 +10,16 @@ def get_courses_by_codes(codes):
         WHERE code IN ({placeholders})
         ORDER BY code
     """
-    cur.execute(query, codes)
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute(query, codes).fetchall()
     return [r["code"] for r in rows]
 
 def get_all_courses():
     """
     Devuelve una lista con TODOS los códigos de ramos de la tabla course_summary.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT code FROM course_summary ORDER BY code")
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute("SELECT code FROM course_summary ORDER BY code").fetchall()
     return [r["code"] for r in rows]
 
 def get_course_names_map(codes):
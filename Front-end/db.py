@@ -0,0 +1,107 @@
+# db.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_PATH = Path(__file__).resolve().parent / "ramos_uc.db"
+
+# Conexiones abiertas como máximo por base. Streamlit corre cada rerun en un
+# hilo nuevo y el feed atiende cada consulta en otro, así que las conexiones
+# no se atan a un hilo: se piden al pool y se devuelven al terminar
+POOL_SIZE = 8
+# Con varias sesiones de Streamlit, los trabajos de fondo y el feed escribiendo
+# a la vez, un escritor espera al otro en vez de fallar con "database is locked"
+BUSY_TIMEOUT_MS = 5000
+# Sentencias preparadas que guarda cada conexión (sqlite3 trae 128)
+CACHED_STATEMENTS = 256
+
+_pools = {}          # ruta -> LifoQueue de conexiones libres
+_abiertas = {}       # ruta -> conexiones creadas
+_lock = threading.Lock()
+
+def _init_db(path):
+    """Se corre una vez por base: WAL queda guardado en el archivo."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        # WAL: las lecturas no bloquean al escritor ni al revés
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row
+    # Con WAL, synchronous=NORMAL no pierde consistencia, solo las últimas
+    # transacciones si se corta la luz
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+def _take(path):
+    with _lock:
+        if path not in _pools:
+            _init_db(path)
+            _pools[path] = queue.LifoQueue()
+            _abiertas[path] = 0
+        libres = _pools[path]
+        try:
+            return libres.get_nowait()
+        except queue.Empty:
+            pass
+        if _abiertas[path] < POOL_SIZE:
+            _abiertas[path] += 1
+            nueva = True
+        else:
+            nueva = False
+    if nueva:
+        try:
+            return _connect(path)
+        except Exception:
+            with _lock:
+                _abiertas[path] -= 1
+            raise
+    try:
+        return libres.get(timeout=BUSY_TIMEOUT_MS / 1000)
+    except queue.Empty:
+        raise sqlite3.OperationalError("No hay conexiones libres a la base") from None
+
+def _give_back(path, conn):
+    if conn.in_transaction:
+        conn.rollback()
+    _pools[path].put(conn)
+
+@contextmanager
+def connection():
+    """
+    Conexión a ramos_uc.db tomada del pool y devuelta al salir del bloque:
+
+        with connection() as conn:
+            row = conn.execute(...).fetchone()
+            with conn:          # escrituras: commit o rollback
+                conn.execute(...)
+
+    Una transacción que quede abierta al salir se deshace.
+    """
+    path = str(DB_PATH)
+    conn = _take(path)
+    try:
+        yield conn
+    finally:
+        _give_back(path, conn)
+
+def close_connections():
+    """Cierra las conexiones libres de todos los pools (p. ej. al cambiar DB_PATH)."""
+    with _lock:
+        for path, libres in _pools.items():
+            while True:
+                try:
+                    libres.get_nowait().close()
+                except queue.Empty:
+                    break
+                _abiertas[path] -= 1
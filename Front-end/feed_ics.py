@@ -0,0 +1,179 @@
+# feed_ics.py
+import hashlib
+import re
+import secrets
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.gen_calendar import iterar_ics
+from backend.modelos import PlanEstudio
+from backend.parametros import FEED_ICS_HOST, FEED_ICS_PUERTO, FEED_ICS_URL_BASE
+from db import connection
+from onboarding import get_onboarding
+from planes import get_latest_plans, get_plans_signature
+
+# /feed/<token>.ics (todos los ramos) o /feed/<token>/<ramo>.ics
+_RUTA_FEED = re.compile(r"^/feed/([A-Za-z0-9_-]+)(?:/([^/]+))?\.ics$")
+
+# Cuerpos ya generados: (user_id, ramo o None) -> (firma, cuerpo, etag, última modificación)
+MAX_FEEDS_EN_CACHE = 256
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+def init_feed_tokens_table():
+    with connection() as conn, conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feed_tokens (
+                user_id INTEGER PRIMARY KEY,
+                token TEXT NOT NULL UNIQUE,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+            """
+        )
+
+def get_feed_token(user_id, renew=False):
+    """Token secreto de la URL del feed del usuario; con renew=True se invalida el anterior."""
+    with connection() as conn:
+        row = conn.execute("SELECT token FROM feed_tokens WHERE user_id = ?", (user_id,)).fetchone()
+        if row and not renew:
+            return row["token"]
+        token = secrets.token_urlsafe(24)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO feed_tokens (user_id, token) VALUES (?, ?)",
+                (user_id, token),
+            )
+    return token
+
+def _user_for_token(token):
+    with connection() as conn:
+        row = conn.execute("SELECT user_id FROM feed_tokens WHERE token = ?", (token,)).fetchone()
+    return row["user_id"] if row else None
+
+def feed_url(token, course_code=None):
+    base = FEED_ICS_URL_BASE.rstrip("/") or f"http://{FEED_ICS_HOST}:{FEED_ICS_PUERTO}"
+    return f"{base}/feed/{token}" + (f"/{quote(course_code)}" if course_code else "") + ".ics"
+
+def _selected_courses(user_id):
+    data = get_onboarding(user_id)
+    if not data or not data["selected_ramos"]:
+        return set()
+    return {r.strip() for r in data["selected_ramos"].split(",") if r.strip()}
+
+def _render_feed(user_id, course_code):
+    """
+    (cuerpo, etag, última modificación) del feed, o None si no hay planes.
+    Solo se vuelve a generar si cambió la versión de algún plan del feed.
+    """
+    ramos = {course_code} if course_code else _selected_courses(user_id)
+    firma = tuple(f for f in get_plans_signature(user_id) if f[0] in ramos)
+    if not firma:
+        return None
+    clave = (user_id, course_code)
+    with _cache_lock:
+        guardado = _cache.get(clave)
+        if guardado and guardado[0] == firma:
+            _cache.move_to_end(clave)
+            return guardado[1:]
+
+    planes = [PlanEstudio.model_validate_json(p["plan_json"]) for p in get_latest_plans(user_id, ramos)]
+    # created_at es hora local; el DTSTAMP sale de ahí para que el cuerpo (y el
+    # ETag) no cambien si nada cambió, aunque se reinicie la app
+    modificado = datetime.fromisoformat(max(f[2] for f in firma)).astimezone(timezone.utc)
+    cuerpo = "".join(iterar_ics(planes, dtstamp=modificado, prefijo_curso=course_code is None)).encode("utf-8")
+    etag = '"' + hashlib.sha1(cuerpo).hexdigest()[:20] + '"'
+
+    with _cache_lock:
+        _cache[clave] = (firma, cuerpo, etag, modificado)
+        _cache.move_to_end(clave)
+        while len(_cache) > MAX_FEEDS_EN_CACHE:
+            _cache.popitem(last=False)
+    return cuerpo, etag, modificado
+
+def _not_modified(headers, etag, modificado):
+    # If-None-Match manda sobre If-Modified-Since (RFC 9110 13.2.2)
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        etags = [e.strip() for e in if_none_match.split(",")]
+        return "*" in etags or etag in etags or f"W/{etag}" in etags
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return modificado.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    server_version = "SmartSemesterFeed/1.0"
+
+    def _responder(self, con_cuerpo):
+        m = _RUTA_FEED.match(self.path.split("?", 1)[0])
+        user_id = _user_for_token(m.group(1)) if m else None
+        course_code = unquote(m.group(2)) if m and m.group(2) else None
+        resultado = _render_feed(user_id, course_code) if user_id is not None else None
+        if resultado is None:
+            self.send_error(404)
+            return
+        cuerpo, etag, modificado = resultado
+        cabeceras = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(modificado, usegmt=True),
+            "Cache-Control": "private, max-age=300",
+        }
+        if _not_modified(self.headers, etag, modificado):
+            self.send_response(304)
+            for k, v in cabeceras.items():
+                self.send_header(k, v)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in cabeceras.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if con_cuerpo:
+            self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self._responder(con_cuerpo=True)
+
+    def do_HEAD(self):
+        self._responder(con_cuerpo=False)
+
+    def log_message(self, format, *args):
+        # Los clientes de calendario consultan seguido; no se llena la consola
+        pass
+
+def start_feed_server():
+    """
+    Levanta (una vez por proceso) el servidor del feed en un hilo de fondo.
+    Devuelve el servidor, o None si está desactivado o el puerto está ocupado.
+    """
+    global _servidor
+    if FEED_ICS_PUERTO <= 0:
+        return None
+    with _servidor_lock:
+        if _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer((FEED_ICS_HOST, FEED_ICS_PUERTO), _FeedHandler)
+            except OSError:
+                return None
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, name="feed-ics", daemon=True).start()
+        return _servidor
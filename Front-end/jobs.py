@@ -0,0 +1,201 @@
+# jobs.py
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.parametros import PLAN_JOBS_WORKERS
+from backend.planificador import iterar_plan_y_ics_multimodal
+from db import connection
+from planes import save_plan
+
+# Cada proceso renueva updated_at de sus trabajos pendientes cada LATIDO_S.
+# Uno "queued"/"running" sin latido por más de TRABAJO_HUERFANO_S quedó
+# huérfano: el proceso que lo corría se cayó o se reinició
+LATIDO_S = 15
+TRABAJO_HUERFANO_S = 120
+
+# Identifica a este proceso, para saber qué trabajos le toca mantener vivos
+_INSTANCIA = uuid.uuid4().hex
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_latido = None
+_latido_lock = threading.Lock()
+
+def init_jobs_table():
+    with connection() as conn, conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                course_code TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                partial TEXT,
+                plan_version INTEGER,
+                error TEXT,
+                instance TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, course_code, id)"
+        )
+    _iniciar_latido()
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _latir():
+    """Renueva los trabajos pendientes de este proceso y marca los huérfanos de otros."""
+    limite = (datetime.now() - timedelta(seconds=TRABAJO_HUERFANO_S)).isoformat(timespec="seconds")
+    with connection() as conn, conn:
+        conn.execute(
+            "UPDATE jobs SET updated_at = ? WHERE status IN ('queued', 'running') AND instance = ?",
+            (_now(), _INSTANCIA),
+        )
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'error', error = 'Interrumpido: la app se reinició.', updated_at = ?
+            WHERE status IN ('queued', 'running') AND instance != ? AND updated_at < ?
+            """,
+            (_now(), _INSTANCIA, limite),
+        )
+
+def _bucle_latido():
+    while True:
+        try:
+            _latir()
+        except Exception:
+            # Base ocupada u otro error pasajero: se reintenta en el próximo latido
+            pass
+        time.sleep(LATIDO_S)
+
+def _iniciar_latido():
+    """Levanta (una vez por proceso) el hilo del latido; su primera pasada barre los huérfanos."""
+    global _latido
+    with _latido_lock:
+        if _latido is None:
+            _latido = threading.Thread(target=_bucle_latido, name="plan-job-latido", daemon=True)
+            _latido.start()
+
+def _update_job(job_id, **campos):
+    campos["updated_at"] = _now()
+    columnas = ", ".join(f"{k} = ?" for k in campos)
+    with connection() as conn, conn:
+        conn.execute(f"UPDATE jobs SET {columnas} WHERE id = ?", (*campos.values(), job_id))
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=PLAN_JOBS_WORKERS, thread_name_prefix="plan-job")
+        return _pool
+
+def _run_job(job_id, user_id, course_code, payload, input_hash):
+    """Corre en un hilo del pool: genera el plan y va dejando el avance en la tabla."""
+    _update_job(job_id, status="running", stage="Leyendo material", progress=0.05)
+    semanas, total = [], 0
+    try:
+        for evento in iterar_plan_y_ics_multimodal(payload):
+            if evento[0] == "borrador":
+                # El plan local sirve para estimar cuántas semanas faltan
+                total = len(evento[1].semanas)
+                _update_job(job_id, stage="Esperando a Gemini", progress=0.2)
+            elif evento[0] == "semana":
+                semanas.append(evento[1].model_dump())
+                avance = 0.2 + 0.7 * min(1.0, len(semanas) / total) if total else 0.5
+                _update_job(
+                    job_id,
+                    stage=f"Semana {len(semanas)}" + (f" de {total}" if total else ""),
+                    progress=avance,
+                    partial=json.dumps(semanas, ensure_ascii=False),
+                )
+            else:
+                _, plan, ics_str = evento
+                _update_job(job_id, stage="Guardando", progress=0.95)
+                version = save_plan(user_id, course_code, plan.model_dump_json(), ics_str, input_hash=input_hash)
+                _update_job(
+                    job_id, status="done", stage="Listo", progress=1.0,
+                    partial=None, plan_version=version,
+                )
+    except Exception as e:
+        _update_job(job_id, status="error", error=str(e) or e.__class__.__name__)
+
+def enqueue_plan_job(user_id, course_code, payload, input_hash=None):
+    """
+    Encola la generación del plan de un ramo y vuelve de inmediato con el id
+    del trabajo. Si el ramo ya tiene un trabajo pendiente, devuelve ese.
+    """
+    activo = get_active_job(user_id, course_code)
+    if activo:
+        return activo["id"]
+    with connection() as conn, conn:
+        cur = conn.execute(
+            """
+            INSERT INTO jobs (user_id, course_code, status, stage, progress, instance, created_at, updated_at)
+            VALUES (?, ?, 'queued', 'En cola', 0, ?, ?, ?)
+            """,
+            (user_id, course_code, _INSTANCIA, _now(), _now()),
+        )
+        job_id = cur.lastrowid
+    _obtener_pool().submit(_run_job, job_id, user_id, course_code, payload, input_hash)
+    return job_id
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["partial"] = json.loads(job["partial"]) if job["partial"] else []
+    return job
+
+def get_job(job_id):
+    with connection() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row)
+
+def get_active_job(user_id, course_code):
+    with connection() as conn:
+        row = conn.execute(
+            """
+            SELECT * FROM jobs WHERE user_id = ? AND course_code = ? AND status IN ('queued', 'running')
+            ORDER BY id DESC LIMIT 1
+            """,
+            (user_id, course_code),
+        ).fetchone()
+    return _row_to_job(row)
+
+def get_latest_job(user_id, course_code):
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE user_id = ? AND course_code = ? ORDER BY id DESC LIMIT 1",
+            (user_id, course_code),
+        ).fetchone()
+    return _row_to_job(row)
+
+def get_user_jobs(user_id, limit=10):
+    """Últimos trabajos del usuario (sin el avance parcial), del más nuevo al más viejo."""
+    with connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, course_code, status, stage, progress, plan_version, error, created_at, updated_at
+            FROM jobs WHERE user_id = ? ORDER BY id DESC LIMIT ?
+            """,
+            (user_id, limit),
+        ).fetchall()
+    return [dict(r) for r in rows]
@@ -1,17 +1,8 @@
 # onboarding.py
-import sqlite3
-from pathlib import Path
-
-DB_PATH = Path(__file__).resolve().parent / "ramos_uc.db"
-
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+from db import connection
 
 def init_onboarding_table():
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS onboarding (
@@ -23,11 +14,9 @@ def init_onboarding_table():
             );
             """
         )
-    conn.close()
 
 def save_onboarding(user_id, selected_ramos, availability, mood):
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute(
             """
             INSERT OR REPLACE INTO onboarding (user_id, selected_ramos, availability, mood)
@@ -35,43 +24,33 @@ def save_onboarding(user_id, selected_ramos, availability, mood):
             """,
             (user_id, selected_ramos, availability, mood),
         )
-    conn.close()
 
 def get_onboarding(user_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM onboarding WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with connection() as conn:
+        return conn.execute("SELECT * FROM onboarding WHERE user_id = ?", (user_id,)).fetchone()
 def update_availability(user_id, availability):
     """
     Actualiza solo la disponibilidad del usuario en la tabla onboarding.
     """
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute(
             "UPDATE onboarding SET availability = ? WHERE user_id = ?",
             (availability, user_id),
         )
-    conn.close()
 
 
 def update_mood(user_id, mood):
     """
     Actualiza solo el mood del usuario en la tabla onboarding.
     """
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute(
             "UPDATE onboarding SET mood = ? WHERE user_id = ?",
             (mood, user_id),
         )
-    conn.close()
 
 def init_weekly_availability_table():
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS weekly_availability (
                 user_id INTEGER,
@@ -80,30 +59,23 @@ def init_weekly_availability_table():
                 PRIMARY KEY (user_id, week)
             );
         """)
-    conn.close()
 
 def save_weekly_availability(user_id, week, days):
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute("""
             INSERT OR REPLACE INTO weekly_availability (user_id, week, days)
             VALUES (?, ?, ?)
         """, (user_id, week, days))
-    conn.close()
 
 def get_weekly_availability(user_id, week):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT days FROM weekly_availability WHERE user_id = ? AND week = ?
-    """, (user_id, week))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("""
+            SELECT days FROM weekly_availability WHERE user_id = ? AND week = ?
+        """, (user_id, week)).fetchone()
     return row["days"] if row else ""
 
 def init_daily_mood_table():
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS daily_mood (
                 user_id INTEGER,
@@ -112,25 +84,21 @@ def init_daily_mood_table():
                 PRIMARY KEY (user_id, date)
             );
         """)
-    conn.close()
 
 from datetime import date
 
 def save_daily_mood(user_id, mood):
     today = str(date.today())
-    conn = get_connection()
-    with conn:
+    with connection() as conn, conn:
         conn.execute("""
             INSERT OR REPLACE INTO daily_mood(user_id, date, mood)
             VALUES (?, ?, ?)
         """, (user_id, today, mood))
-    conn.close()
 
 def get_daily_mood(user_id):
     today = str(date.today())
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT mood FROM daily_mood WHERE user_id = ? AND date = ?", (user_id, today))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT mood FROM daily_mood WHERE user_id = ? AND date = ?", (user_id, today)
+        ).fetchone()
     return row["mood"] if row else None
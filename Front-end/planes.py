@@ -0,0 +1,232 @@
+# planes.py
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from db import connection
+
+def init_plans_table():
+    with connection() as conn, conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                course_code TEXT NOT NULL,
+                input_hash TEXT,
+                version INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                plan_json BLOB NOT NULL,
+                ics BLOB NOT NULL,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+            """
+        )
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_plans_version ON plans(user_id, course_code, version)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plans_hash ON plans(user_id, course_code, input_hash)"
+        )
+
+def input_hash(payload):
+    """
+    Hash de todo lo que define un plan: curso, material (bytes de cada
+    archivo), bloques de disponibilidad y ánimo. Mismo hash = mismo plan.
+    """
+    h = hashlib.sha256()
+    datos = {
+        "curso": payload.get("curso", {}),
+        "semestre": payload.get("semestre", {}),
+        "bloques": payload.get("disponibilidad", {}).get("bloques", []),
+        "estado_animo": payload.get("estado_animo"),
+        "intensidad": payload.get("intensidad"),
+        "evaluaciones": payload.get("evaluaciones_conocidas", []),
+    }
+    h.update(json.dumps(datos, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for e in payload.get("entradas", []) or []:
+        h.update(b"\0")
+        h.update(f"{e.get('tipo')}|{e.get('formato')}|{e.get('nombre')}".encode("utf-8"))
+        contenido = e.get("contenido")
+        if isinstance(contenido, (bytes, bytearray, memoryview)):
+            h.update(contenido)
+        elif e.get("ruta"):
+            h.update(Path(e["ruta"]).read_bytes())
+        else:
+            h.update((e.get("contenido_base64") or "").encode("ascii"))
+    return h.hexdigest()
+
+def save_plan(user_id, course_code, plan_json, ics, input_hash=None):
+    """Guarda una nueva versión del plan (comprimida). Devuelve su número de versión."""
+    with connection() as conn, conn:
+        # Toma el lock de escritura antes de leer MAX(version): dos trabajos
+        # guardando el mismo ramo a la vez no pueden sacar el mismo número
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) AS v FROM plans WHERE user_id = ? AND course_code = ?",
+            (user_id, course_code),
+        ).fetchone()
+        version = row["v"] + 1
+        conn.execute(
+            """
+            INSERT INTO plans (user_id, course_code, input_hash, version, created_at, plan_json, ics)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id, course_code, input_hash, version,
+                datetime.now().isoformat(timespec="seconds"),
+                zlib.compress(plan_json.encode("utf-8")),
+                zlib.compress(ics.encode("utf-8")),
+            ),
+        )
+    return version
+
+def _row_to_plan(row):
+    if row is None:
+        return None
+    return {
+        "version": row["version"],
+        "created_at": row["created_at"],
+        "input_hash": row["input_hash"],
+        "plan_json": zlib.decompress(row["plan_json"]).decode("utf-8"),
+        "ics": zlib.decompress(row["ics"]).decode("utf-8"),
+    }
+
+def get_plan_for_inputs(user_id, course_code, input_hash):
+    """El plan más reciente generado con exactamente esas entradas, o None."""
+    with connection() as conn:
+        row = conn.execute(
+            """
+            SELECT * FROM plans WHERE user_id = ? AND course_code = ? AND input_hash = ?
+            ORDER BY version DESC LIMIT 1
+            """,
+            (user_id, course_code, input_hash),
+        ).fetchone()
+    return _row_to_plan(row)
+
+def get_latest_plan(user_id, course_code, version=None):
+    """La última versión del plan del ramo (o la versión pedida), o None."""
+    with connection() as conn:
+        if version is None:
+            row = conn.execute(
+                "SELECT * FROM plans WHERE user_id = ? AND course_code = ? ORDER BY version DESC LIMIT 1",
+                (user_id, course_code),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT * FROM plans WHERE user_id = ? AND course_code = ? AND version = ?",
+                (user_id, course_code, version),
+            ).fetchone()
+    return _row_to_plan(row)
+
+def get_plan_history(user_id, course_code):
+    """Versiones guardadas del plan (sin descomprimir), de la más nueva a la más vieja."""
+    with connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT version, created_at, input_hash FROM plans
+            WHERE user_id = ? AND course_code = ? ORDER BY version DESC
+            """,
+            (user_id, course_code),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+def get_latest_plans(user_id, course_codes=None):
+    """La última versión del plan de cada ramo del usuario (opcionalmente solo de course_codes)."""
+    with connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT p.* FROM plans p
+            JOIN (
+                SELECT course_code, MAX(version) AS version FROM plans
+                WHERE user_id = ? GROUP BY course_code
+            ) m ON p.course_code = m.course_code AND p.version = m.version
+            WHERE p.user_id = ? ORDER BY p.course_code
+            """,
+            (user_id, user_id),
+        ).fetchall()
+    planes = []
+    for r in rows:
+        if course_codes is None or r["course_code"] in course_codes:
+            plan = _row_to_plan(r)
+            plan["course_code"] = r["course_code"]
+            planes.append(plan)
+    return planes
+
+def get_plans_signature(user_id):
+    """
+    (ramo, última versión, fecha) de cada ramo del usuario, sin leer los
+    planes. Cambia apenas se guarda una versión nueva de cualquier plan.
+    """
+    with connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT course_code, MAX(version) AS version, MAX(created_at) AS created_at
+            FROM plans WHERE user_id = ? GROUP BY course_code ORDER BY course_code
+            """,
+            (user_id,),
+        ).fetchall()
+    return [tuple(r) for r in rows]
+
+def init_calendar_table():
+    with connection() as conn, conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS calendar_events (
+                user_id INTEGER NOT NULL,
+                scope TEXT NOT NULL,
+                uid TEXT NOT NULL,
+                sequence INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                dtstamp TEXT NOT NULL,
+                dtstart TEXT NOT NULL,
+                dtend TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                cancelled INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, scope, uid),
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+            """
+        )
+
+def get_calendar_state(user_id, scope):
+    """
+    Eventos de la última exportación del calendario (`scope` es el código
+    del ramo o "semestre"), en el formato de gen_calendar.exportar_ics.
+    """
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM calendar_events WHERE user_id = ? AND scope = ?",
+            (user_id, scope),
+        ).fetchall()
+    return {
+        r["uid"]: {
+            "secuencia": r["sequence"],
+            "huella": r["fingerprint"],
+            "dtstamp": r["dtstamp"],
+            "dtstart": r["dtstart"],
+            "dtend": r["dtend"],
+            "resumen": r["summary"],
+            "cancelado": bool(r["cancelled"]),
+        }
+        for r in rows
+    }
+
+def save_calendar_state(user_id, scope, estado):
+    """Reemplaza el estado guardado por el de la exportación que se acaba de descargar."""
+    with connection() as conn, conn:
+        conn.execute("DELETE FROM calendar_events WHERE user_id = ? AND scope = ?", (user_id, scope))
+        conn.executemany(
+            """
+            INSERT INTO calendar_events
+                (user_id, scope, uid, sequence, fingerprint, dtstamp, dtstart, dtend, summary, cancelled)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (user_id, scope, uid, ev["secuencia"], ev["huella"], ev["dtstamp"],
+                 ev["dtstart"], ev["dtend"], ev["resumen"], int(ev["cancelado"]))
+                for uid, ev in estado.items()
+            ],
+        )
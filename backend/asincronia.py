@@ -0,0 +1,35 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def obtener_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop de fondo compartido por todo el proceso.
+    Corre en un hilo daemon; así los clientes async (y sus conexiones)
+    viven siempre en el mismo loop aunque los llamen hilos distintos.
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            hilo = threading.Thread(target=loop.run_forever, name="smartsemester-async", daemon=True)
+            hilo.start()
+            _loop = loop
+        return _loop
+
+
+def ejecutar(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Ejecuta una corrutina en el loop de fondo y espera su resultado desde código síncrono."""
+    loop = obtener_loop()
+    try:
+        actual = asyncio.get_running_loop()
+    except RuntimeError:
+        actual = None
+    if actual is loop:
+        coro.close()
+        raise RuntimeError("ejecutar() no se puede llamar desde el loop de fondo; usa await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
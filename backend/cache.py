@@ -0,0 +1,162 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def clave_contenido(data: bytes, *partes: str) -> str:
+    """
+    Clave estable para un contenido binario: sha256 de los bytes más
+    las partes extra (formato, versión del extractor, etc.).
+    """
+    h = hashlib.sha256()
+    h.update(data)
+    for p in partes:
+        h.update(b"\0")
+        h.update(str(p).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheSQLite:
+    """
+    Cache clave -> texto guardada en SQLite.
+    Desaloja por LRU cuando se pasa de max_entradas o de max_bytes y lleva
+    contadores de aciertos/fallos por tabla. Con ttl_segundos, las entradas
+    más viejas que eso cuentan como fallo y se borran al leerlas.
+    Si la base falla, se comporta como un cache vacío en vez de romper el
+    flujo que la usa.
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        tabla: str,
+        max_entradas: int = 500,
+        max_bytes: int = 200 * 1024 * 1024,
+        ttl_segundos: Optional[float] = None,
+    ):
+        if not tabla.isidentifier():
+            raise ValueError(f"Nombre de tabla inválido: {tabla}")
+        self.ruta = str(ruta)
+        self.tabla = tabla
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+
+        Path(self.ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.ruta, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {tabla} (
+                    clave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    creado REAL NOT NULL,
+                    usado REAL NOT NULL
+                );
+                """
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_usado ON {tabla}(usado)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    tabla TEXT PRIMARY KEY,
+                    aciertos INTEGER NOT NULL DEFAULT 0,
+                    fallos INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+            self._conn.execute("INSERT OR IGNORE INTO cache_stats (tabla) VALUES (?)", (tabla,))
+
+    def _contar(self, columna: str) -> None:
+        self._conn.execute(f"UPDATE cache_stats SET {columna} = {columna} + 1 WHERE tabla = ?", (self.tabla,))
+
+    def get(self, clave: str) -> Optional[str]:
+        with self._lock:
+            try:
+                with self._conn:
+                    row = self._conn.execute(
+                        f"SELECT valor, creado FROM {self.tabla} WHERE clave = ?", (clave,)
+                    ).fetchone()
+                    ahora = time.time()
+                    if row is not None and self.ttl_segundos and ahora - row[1] > self.ttl_segundos:
+                        self._conn.execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+                        row = None
+                    if row is None:
+                        self._contar("fallos")
+                        return None
+                    self._conn.execute(
+                        f"UPDATE {self.tabla} SET usado = ? WHERE clave = ?", (ahora, clave)
+                    )
+                    self._contar("aciertos")
+                    return row[0]
+            except sqlite3.Error:
+                return None
+
+    def set(self, clave: str, valor: str) -> None:
+        tam = len(valor.encode("utf-8"))
+        if self.max_entradas <= 0 or tam > self.max_bytes:
+            return
+        ahora = time.time()
+        with self._lock:
+            try:
+                with self._conn:
+                    # Re-guardar el mismo valor no renueva su antigüedad (TTL)
+                    self._conn.execute(
+                        f"""
+                        INSERT INTO {self.tabla} (clave, valor, bytes, creado, usado) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(clave) DO UPDATE SET
+                            creado = CASE WHEN valor = excluded.valor THEN creado ELSE excluded.creado END,
+                            valor = excluded.valor,
+                            bytes = excluded.bytes,
+                            usado = excluded.usado
+                        """,
+                        (clave, valor, tam, ahora, ahora),
+                    )
+                    self._desalojar()
+            except sqlite3.Error:
+                pass
+
+    def _desalojar(self) -> None:
+        n, total = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM {self.tabla}"
+        ).fetchone()
+        if n <= self.max_entradas and total <= self.max_bytes:
+            return
+        viejas = self._conn.execute(f"SELECT clave, bytes FROM {self.tabla} ORDER BY usado ASC").fetchall()
+        borrar = []
+        for clave, tam in viejas:
+            if n <= self.max_entradas and total <= self.max_bytes:
+                break
+            borrar.append((clave,))
+            n -= 1
+            total -= tam
+        self._conn.executemany(f"DELETE FROM {self.tabla} WHERE clave = ?", borrar)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {self.tabla}")
+                self._conn.execute(
+                    "UPDATE cache_stats SET aciertos = 0, fallos = 0 WHERE tabla = ?", (self.tabla,)
+                )
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            n, total = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM {self.tabla}"
+            ).fetchone()
+            row = self._conn.execute(
+                "SELECT aciertos, fallos FROM cache_stats WHERE tabla = ?", (self.tabla,)
+            ).fetchone()
+        aciertos, fallos = row if row else (0, 0)
+        return {"entradas": n, "bytes": total, "aciertos": aciertos, "fallos": fallos}
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,98 @@
+# type:ignore
+import atexit
+import threading
+from typing import Any, Callable, Optional
+
+from google import genai
+from google.genai import types as genai_types
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+from .asincronia import ejecutar
+from .parametros import GENAI_KEY, GEMINI_MODEL_RESUMEN, GEMINI_MAX_CONEXIONES, GEMINI_KEEPALIVE_S
+
+_fabrica: Optional[Callable[[], Any]] = None
+_cliente = None
+_lock = threading.Lock()
+
+
+def _crear_cliente_por_defecto():
+    if httpx is None:
+        return genai.Client(api_key=GENAI_KEY)
+    limites = httpx.Limits(
+        max_connections=GEMINI_MAX_CONEXIONES,
+        max_keepalive_connections=GEMINI_MAX_CONEXIONES,
+        keepalive_expiry=GEMINI_KEEPALIVE_S,
+    )
+    opciones = genai_types.HttpOptions(
+        client_args={"limits": limites},
+        async_client_args={"limits": limites},
+    )
+    return genai.Client(api_key=GENAI_KEY, http_options=opciones)
+
+
+def obtener_cliente():
+    """
+    Cliente de Gemini compartido por todo el proceso (sesiones de Streamlit,
+    hilos y el loop de fondo). Se crea la primera vez que se pide y mantiene
+    sus conexiones vivas entre llamadas.
+    """
+    global _cliente
+    with _lock:
+        if _cliente is None:
+            _cliente = (_fabrica or _crear_cliente_por_defecto)()
+        return _cliente
+
+
+def configurar_fabrica_cliente(fabrica: Optional[Callable[[], Any]]) -> None:
+    """
+    Cambia cómo se construye el cliente, p.ej. un stub local para pruebas o
+    benchmarks. Con None se vuelve al cliente real. Cierra el cliente actual.
+    """
+    global _fabrica
+    cerrar_cliente()
+    with _lock:
+        _fabrica = fabrica
+
+
+def _cerrar(cliente) -> None:
+    try:
+        aio = getattr(cliente, "aio", None)
+        if aio is not None and hasattr(aio, "aclose"):
+            ejecutar(aio.aclose(), timeout=5)
+    except Exception:
+        pass
+    try:
+        if hasattr(cliente, "close"):
+            cliente.close()
+    except Exception:
+        pass
+
+
+def cerrar_cliente() -> None:
+    """Cierra las conexiones del cliente compartido; el próximo uso crea uno nuevo."""
+    global _cliente
+    with _lock:
+        cliente, _cliente = _cliente, None
+    if cliente is not None:
+        _cerrar(cliente)
+
+
+def verificar_cliente() -> bool:
+    """
+    Health check barato: pide los metadatos del modelo de resumen (no genera
+    contenido ni gasta cuota de tokens). Si falla, descarta el cliente para
+    que la próxima llamada parta con conexiones nuevas.
+    """
+    try:
+        obtener_cliente().models.get(model=GEMINI_MODEL_RESUMEN)
+        return True
+    except Exception:
+        cerrar_cliente()
+        return False
+
+
+atexit.register(cerrar_cliente)
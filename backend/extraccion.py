@@ -0,0 +1,534 @@
+# type:ignore
+import atexit
+import base64
+import io
+import math
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+try:
+    import PyPDF2
+except Exception:
+    PyPDF2 = None
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+from .parametros import (
+    CACHE_DB_PATH, CACHE_EXTRACCION_MAX_ENTRADAS, CACHE_EXTRACCION_MAX_MB,
+    EXTRACCION_WORKERS, EXTRACCION_TIMEOUT_S, EXTRACCION_PAGINAS_POR_TAREA,
+    EXTRACCION_FACTOR_EXPLORACION, OCR_PDF_ESCANEADOS,
+)
+from .cache import CacheSQLite, clave_contenido
+from .ocr import ocr_disponible, ocr_imagen, ocr_pagina_pdf
+
+# Subir cuando cambie la forma de extraer texto, para invalidar el cache
+VERSION_EXTRACTOR = "2"
+
+# Páginas con fechas o palabras de evaluación suelen traer el calendario del ramo
+_PATRON_PAGINA_RELEVANTE = re.compile(
+    r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b|\d+(?:[.,]\d+)?\s*%"
+    r"|certamen|examen|control|tarea|evaluaci[oó]n|ponderaci[oó]n|calendario|cronograma",
+    re.IGNORECASE,
+)
+
+# Caracteres que se estiman por página (o imagen) al comparar tamaños sin extraer
+CARACTERES_POR_PAGINA = 2000
+
+_cache_extraccion = None
+
+# Un pool por cantidad de workers, compartido por todas las llamadas (lotes y
+# trabajos de fondo extraen a la vez)
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+# Los workers no se crean con fork: heredarían el estado de los hilos del
+# proceso (pool de OCR, loop de fondo) sin los hilos, y lo que los use en el
+# worker se queda esperando para siempre
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _CONTEXTO_POOL = multiprocessing.get_context("forkserver")
+    # El servidor importa este módulo una vez y cada worker parte con él cargado
+    _CONTEXTO_POOL.set_forkserver_preload([__name__])
+else:
+    _CONTEXTO_POOL = multiprocessing.get_context("spawn")
+
+
+def _decode_base64_to_bytes(b64: str) -> bytes:
+    return base64.b64decode(b64)
+
+
+class _LectorBuffer(io.RawIOBase):
+    """
+    Stream de solo lectura sobre un buffer (bytes, memoryview, mmap) sin
+    copiarlo. Al cerrarlo suelta sus vistas del buffer (un mmap con vistas
+    vivas no se puede cerrar) y, si `propio`, cierra también el buffer.
+    """
+
+    def __init__(self, buf, propio: bool = False):
+        self._origen = buf if propio else None
+        self._vista = memoryview(buf)
+        self._buf = self._vista.cast("B")
+        self._pos = 0
+
+    def close(self) -> None:
+        if not self.closed:
+            self._buf.release()
+            self._vista.release()
+            if self._origen is not None and hasattr(self._origen, "close"):
+                self._origen.close()
+        super().close()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        n = max(0, min(len(destino), len(self._buf) - self._pos))
+        destino[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._buf)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _mapear_descriptor(fd: int):
+    if os.fstat(fd).st_size == 0:
+        return b""
+    return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+
+
+def _mapear_archivo(ruta):
+    with open(ruta, "rb") as f:
+        return _mapear_descriptor(f.fileno())
+
+
+def _cerrar_buffer(buf) -> None:
+    """Cierra el mmap que abrió _buffer_de_entrada; bytes y vistas del llamador se dejan."""
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+
+
+def _abrir_stream(fuente):
+    """
+    Stream sobre la fuente, para usar con `with`. Una ruta se mapea a memoria
+    y el mapa se cierra con el stream; bytes/memoryview/mmap se usan tal cual.
+    """
+    if isinstance(fuente, (str, os.PathLike)):
+        return io.BufferedReader(_LectorBuffer(_mapear_archivo(fuente), propio=True))
+    return io.BufferedReader(_LectorBuffer(fuente))
+
+
+def _texto_pagina(pagina) -> str:
+    """Capa de texto de la página; si no tiene (PDF escaneado), OCR de sus imágenes."""
+    texto = (pagina.extract_text() or "").strip()
+    if not texto and OCR_PDF_ESCANEADOS:
+        texto = ocr_pagina_pdf(pagina)
+    return texto
+
+
+def _extraer_texto_pdf(fuente) -> str:
+    if PyPDF2 is None:
+        return ""
+    try:
+        with _abrir_stream(fuente) as stream:
+            reader = PyPDF2.PdfReader(stream)
+            return "\n".join([_texto_pagina(p) for p in reader.pages if p])
+    except Exception:
+        return ""
+
+
+def _extraer_paginas_pdf(fuente, inicio: int, fin: int) -> str:
+    """Texto de las páginas [inicio, fin) de un PDF. Se ejecuta en los workers."""
+    if PyPDF2 is None:
+        return ""
+    try:
+        with _abrir_stream(fuente) as stream:
+            paginas = PyPDF2.PdfReader(stream).pages[inicio:fin]
+            return "\n".join([_texto_pagina(p) for p in paginas if p])
+    except Exception:
+        return ""
+
+
+def _contar_paginas_pdf(fuente) -> int:
+    if PyPDF2 is None:
+        return 0
+    try:
+        with _abrir_stream(fuente) as stream:
+            return len(PyPDF2.PdfReader(stream).pages)
+    except Exception:
+        return 0
+
+
+def iterar_paginas_pdf(fuente) -> Iterator[Tuple[int, str]]:
+    """Genera (indice, texto) página a página, sin parsear las que no se piden."""
+    if PyPDF2 is None:
+        return
+    try:
+        with _abrir_stream(fuente) as stream:
+            for i, pagina in enumerate(PyPDF2.PdfReader(stream).pages):
+                try:
+                    yield i, _texto_pagina(pagina)
+                except Exception:
+                    yield i, ""
+    except Exception:
+        return
+
+
+def _puntaje_pagina(indice: int, texto: str) -> int:
+    # La primera página trae la descripción del curso, también vale la pena
+    return len(_PATRON_PAGINA_RELEVANTE.findall(texto)) + (2 if indice == 0 else 0)
+
+
+def extraer_texto_pdf_con_presupuesto(
+    fuente,
+    max_chars: int,
+    factor_exploracion: Optional[float] = None,
+) -> str:
+    """
+    Lee el PDF página a página y se detiene apenas junta `max_chars` de
+    páginas relevantes (fechas, evaluaciones) o después de revisar
+    `factor_exploracion * max_chars` caracteres en total.
+    De lo leído se quedan primero las páginas con más puntaje, pero el texto
+    final respeta el orden original del documento.
+    """
+    if max_chars <= 0:
+        return ""
+    factor = EXTRACCION_FACTOR_EXPLORACION if factor_exploracion is None else factor_exploracion
+    limite_exploracion = max_chars * max(1.0, factor)
+
+    paginas, vistos, relevantes = [], 0, 0
+    for i, texto in iterar_paginas_pdf(fuente):
+        if not texto:
+            continue
+        puntaje = _puntaje_pagina(i, texto)
+        paginas.append((puntaje, i, texto))
+        vistos += len(texto)
+        if puntaje:
+            relevantes += len(texto)
+        if relevantes >= max_chars or vistos >= limite_exploracion:
+            break
+
+    elegidas, total = [], 0
+    for puntaje, i, texto in sorted(paginas, key=lambda p: (-p[0], p[1])):
+        if total >= max_chars:
+            break
+        recorte = texto[: max_chars - total]
+        elegidas.append((i, recorte))
+        total += len(recorte) + 1
+
+    return "\n".join(t for _, t in sorted(elegidas))[:max_chars]
+
+
+def _ocr_imagen(fuente) -> str:
+    if not ocr_disponible():
+        return ""
+    try:
+        with _abrir_stream(fuente) as stream, Image.open(stream) as imagen:
+            return ocr_imagen(imagen)
+    except Exception:
+        return ""
+
+
+def extraer_texto_pdf_base64(b64: str) -> str:
+    try:
+        return _extraer_texto_pdf(_decode_base64_to_bytes(b64))
+    except Exception:
+        return ""
+
+
+def ocr_imagen_base64(b64: str) -> str:
+    try:
+        return _ocr_imagen(_decode_base64_to_bytes(b64))
+    except Exception:
+        return ""
+
+
+def _obtener_cache_extraccion():
+    global _cache_extraccion
+    if _cache_extraccion is None and CACHE_EXTRACCION_MAX_ENTRADAS > 0:
+        try:
+            _cache_extraccion = CacheSQLite(
+                CACHE_DB_PATH,
+                "cache_extraccion",
+                max_entradas=CACHE_EXTRACCION_MAX_ENTRADAS,
+                max_bytes=int(CACHE_EXTRACCION_MAX_MB * 1024 * 1024),
+            )
+        except Exception:
+            _cache_extraccion = None
+    return _cache_extraccion
+
+
+def estadisticas_cache_extraccion() -> Dict[str, Any]:
+    cache = _obtener_cache_extraccion()
+    return cache.estadisticas() if cache else {}
+
+
+def _buffer_de_entrada(entrada: Dict[str, Any]):
+    """
+    Devuelve el contenido de la entrada como buffer, copiando lo menos posible.
+    Acepta, en orden de preferencia:
+      - "contenido": bytes, bytearray, memoryview o un objeto tipo archivo
+      - "ruta": path a un archivo local (se mapea a memoria)
+      - "contenido_base64": formato antiguo, se decodifica una vez
+    """
+    try:
+        contenido = entrada.get("contenido")
+        if isinstance(contenido, (bytes, bytearray, memoryview)):
+            return contenido
+        if contenido is not None and hasattr(contenido, "read"):
+            if hasattr(contenido, "getbuffer"):
+                return contenido.getbuffer()
+            try:
+                return _mapear_descriptor(contenido.fileno())
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                if hasattr(contenido, "seek"):
+                    contenido.seek(0)
+                return contenido.read()
+
+        if entrada.get("ruta"):
+            return _mapear_archivo(entrada["ruta"])
+
+        b64 = entrada.get("contenido_base64", "")
+        return _decode_base64_to_bytes(b64) if b64 else None
+    except Exception:
+        return None
+
+
+def _fuente_para_pool(entrada: Dict[str, Any], buf):
+    """Lo que viaja a un worker: la ruta si existe (el worker la mapea), si no los bytes."""
+    if entrada.get("ruta") and entrada.get("contenido") is None:
+        return str(entrada["ruta"])
+    return buf if isinstance(buf, bytes) else bytes(buf)
+
+
+def extraer_texto_de_entrada(entrada: Dict[str, Any]) -> str:
+    formato = (entrada.get("formato") or "").lower()
+    buf = _buffer_de_entrada(entrada)
+    try:
+        if buf is None or not len(buf):
+            return ""
+
+        if formato == "texto":
+            return str(buf, "utf-8", "ignore").strip()
+        if formato not in ("pdf", "imagen"):
+            return ""
+
+        # PDF y OCR son caros: se cachean por hash del contenido + formato + versión
+        cache = _obtener_cache_extraccion()
+        clave = clave_contenido(buf, formato, VERSION_EXTRACTOR)
+        if cache:
+            guardado = cache.get(clave)
+            if guardado is not None:
+                return guardado
+
+        texto = _extraer_texto_pdf(buf) if formato == "pdf" else _ocr_imagen(buf)
+        if cache and texto:
+            cache.set(clave, texto)
+        return texto
+    finally:
+        _cerrar_buffer(buf)
+
+
+def tamano_entrada(entrada: Dict[str, Any]) -> int:
+    """
+    Tamaño aproximado de una entrada en caracteres, sin extraer su texto:
+    un texto se mide, un PDF se estima por su número de páginas y una
+    imagen cuenta como una página.
+    """
+    formato = (entrada.get("formato") or "").lower()
+    buf = _buffer_de_entrada(entrada)
+    try:
+        if buf is None or not len(buf):
+            return 0
+        if formato == "texto":
+            return len(buf)
+        if formato == "pdf":
+            return _contar_paginas_pdf(buf) * CARACTERES_POR_PAGINA
+        return CARACTERES_POR_PAGINA if formato == "imagen" else 0
+    finally:
+        _cerrar_buffer(buf)
+
+
+def _workers_por_defecto() -> int:
+    return EXTRACCION_WORKERS if EXTRACCION_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def _obtener_pool(max_workers: int) -> ProcessPoolExecutor:
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=_CONTEXTO_POOL
+            )
+        return pool
+
+
+def _descartar_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Saca un pool roto o con un worker colgado para que las llamadas
+    siguientes usen uno nuevo. No cancela nada: lo que otras llamadas ya
+    encolaron en él termina (o falla) por su cuenta.
+    """
+    with _pool_lock:
+        for workers, actual in list(_pools.items()):
+            if actual is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def cerrar_pool_extraccion(esperar: bool = False) -> None:
+    """
+    Apaga todos los pools de procesos y cancela lo encolado; es para el
+    cierre del proceso. Si quedó un worker colgado, no lo espera.
+    """
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=esperar, cancel_futures=True)
+
+
+atexit.register(cerrar_pool_extraccion)
+
+
+def _tareas_de_entrada(buf, formato: str, max_workers: int, presupuesto: Optional[int] = None) -> List[tuple]:
+    """
+    Parte una entrada en tareas (funcion, args) para el pool; cada funcion
+    recibe la fuente como primer argumento.
+    Un PDF largo se reparte por rangos de páginas, a lo más uno por worker.
+    Con presupuesto el PDF va en una sola tarea, porque corta apenas lo llena.
+    """
+    if formato == "imagen":
+        return [(_ocr_imagen, ())]
+    if presupuesto is not None:
+        return [(extraer_texto_pdf_con_presupuesto, (presupuesto,))]
+
+    n = _contar_paginas_pdf(buf)
+    if n <= EXTRACCION_PAGINAS_POR_TAREA:
+        return [(_extraer_texto_pdf, ())]
+
+    por_tarea = max(EXTRACCION_PAGINAS_POR_TAREA, math.ceil(n / max_workers))
+    return [(_extraer_paginas_pdf, (i, min(i + por_tarea, n))) for i in range(0, n, por_tarea)]
+
+
+def _extraer_en_linea(pendientes: List[tuple], textos: List[str], cache) -> List[str]:
+    for i, clave, _, buf, tareas in pendientes:
+        textos[i] = "\n".join(fn(buf, *args) for fn, args in tareas).strip()
+        if cache and textos[i]:
+            cache.set(clave, textos[i])
+    return textos
+
+
+def extraer_textos_en_paralelo(
+    entradas: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    presupuestos: Optional[List[Optional[int]]] = None,
+) -> List[str]:
+    """
+    Extrae el texto de todas las entradas repartiendo PDFs (por rangos de
+    páginas) e imágenes en un pool de procesos.
+    Devuelve los textos en el mismo orden que `entradas`. Si una entrada no
+    termina antes de `timeout` segundos (contados desde que parte la etapa),
+    su texto queda vacío y el resto sigue normalmente.
+    `presupuestos[i]` (opcional) es el máximo de caracteres que se usarán de
+    la entrada i; los PDFs dejan de parsearse al llenarlo.
+    """
+    max_workers = max_workers or _workers_por_defecto()
+    timeout = EXTRACCION_TIMEOUT_S if timeout is None else timeout
+
+    abiertos = []  # buffers mapeados aquí; se cierran al terminar
+    try:
+        textos = [""] * len(entradas)
+        pendientes = []  # (indice, clave_cache, entrada, buffer, tareas)
+        cache = _obtener_cache_extraccion()
+
+        for i, entrada in enumerate(entradas):
+            formato = (entrada.get("formato") or "").lower()
+            buf = _buffer_de_entrada(entrada)
+            abiertos.append(buf)
+            if buf is None or not len(buf):
+                continue
+            if formato == "texto":
+                textos[i] = str(buf, "utf-8", "ignore").strip()
+                continue
+            if formato not in ("pdf", "imagen"):
+                continue
+
+            presupuesto = presupuestos[i] if presupuestos and formato == "pdf" else None
+            partes_clave = (formato, VERSION_EXTRACTOR) + ((f"max={presupuesto}",) if presupuesto is not None else ())
+            clave = clave_contenido(buf, *partes_clave)
+            guardado = cache.get(clave) if cache else None
+            if guardado is not None:
+                textos[i] = guardado
+                continue
+            pendientes.append((i, clave, entrada, buf, _tareas_de_entrada(buf, formato, max_workers, presupuesto)))
+
+        if not pendientes:
+            return textos
+
+        # Con una sola tarea el pool solo agrega overhead
+        if max_workers <= 1 or sum(len(p[-1]) for p in pendientes) <= 1:
+            return _extraer_en_linea(pendientes, textos, cache)
+
+        pool, futuros = None, []
+        try:
+            pool = _obtener_pool(max_workers)
+            for i, clave, entrada, buf, tareas in pendientes:
+                fuente = _fuente_para_pool(entrada, buf)
+                futuros.append((i, clave, [pool.submit(fn, fuente, *args) for fn, args in tareas]))
+        except (BrokenProcessPool, RuntimeError, OSError):
+            for _, _, futs in futuros:
+                for f in futs:
+                    f.cancel()
+            if pool is not None:
+                _descartar_pool(pool)
+            return _extraer_en_linea(pendientes, textos, cache)
+
+        limite = time.monotonic() + timeout
+        descartar = False
+        for i, clave, futs in futuros:
+            partes = []
+            try:
+                for f in futs:
+                    partes.append(f.result(timeout=max(0.0, limite - time.monotonic())))
+            except FuturesTimeout:
+                # Solo se cancelan las tareas propias que no alcanzaron a partir
+                descartar = True
+                for f in futs:
+                    f.cancel()
+                continue
+            except BrokenProcessPool:
+                descartar = True
+                continue
+            except Exception:
+                continue
+            textos[i] = "\n".join(partes).strip()
+            if cache and textos[i]:
+                cache.set(clave, textos[i])
+
+        # Un worker colgado dejaría el pool tomado para la próxima llamada
+        if descartar:
+            _descartar_pool(pool)
+
+        return textos
+    finally:
+        for buf in abiertos:
+            _cerrar_buffer(buf)
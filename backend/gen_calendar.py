@@ -1,63 +1,345 @@
-from datetime import datetime
-from typing import List
+import hashlib
+import io
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:
+    ZoneInfo = None
 
 from .parametros import ZONA_HORARIA
 from .modelos import PlanEstudio
 
+CRLF = "\r\n"
+MAX_OCTETOS_LINEA = 75
+
+_CABECERA = CRLF.join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Organizador Academico IA//ES//",
+    "CALSCALE:GREGORIAN",
+]) + CRLF
+_PIE = "END:VCALENDAR" + CRLF
+
+_PATRON_FECHA = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})|(\d{4})([-/])(\d{1,2})\6(\d{1,2})")
+_PATRON_HORA = re.compile(r"(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?")
+
 
+@lru_cache(maxsize=4096)
 def _dt_ical(fecha: str, hora: str) -> str:
     """
-    Convierte fecha y hora a formato iCal.
-    Acepta fechas DD-MM-YYYY, YYYY-MM-DD, y tiempos HH:MM u HH:MM:SS.
-    Si el tiempo falta o viene raro, cae en 00:00.
+    Convierte fecha y hora a formato iCal (YYYYMMDDTHHMMSS, hora local).
+    Acepta fechas DD-MM-YYYY, YYYY-MM-DD (con - o /), y tiempos HH:MM u
+    HH:MM:SS. Si el tiempo falta, cae en 00:00.
     """
     fecha = (fecha or "").strip()
     hora = (hora or "").strip() or "00:00"
-    formatos_fecha = ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"]
-    formatos_hora = ["%H:%M", "%H:%M:%S"]
-    for f_fmt in formatos_fecha:
-        for h_fmt in formatos_hora:
-            try:
-                dt = datetime.strptime(f"{fecha} {hora}", f"{f_fmt} {h_fmt}")
-                return dt.strftime("%d%m%YT%H%M%S")
-            except ValueError:
-                continue
+    # Regex + datetime() en vez de probar 8 formatos con strptime: es el
+    # grueso del costo de calendarios con miles de eventos
+    m_fecha = _PATRON_FECHA.fullmatch(fecha)
+    m_hora = _PATRON_HORA.fullmatch(hora)
+    if m_fecha and m_hora:
+        if m_fecha.group(1):
+            d, m, y = m_fecha.group(1, 3, 4)
+        else:
+            y, m, d = m_fecha.group(5, 7, 8)
+        partes = (int(y), int(m), int(d), int(m_hora.group(1)), int(m_hora.group(2)), int(m_hora.group(3) or 0))
+        try:
+            datetime(*partes)  # valida día del mes, hora < 24, etc.
+            return "%04d%02d%02dT%02d%02d%02d" % partes
+        except ValueError:
+            pass
     raise ValueError(f"Formato de fecha no soportado: {fecha} {hora}")
 
-def generar_ics_desde_plan(plan: PlanEstudio) -> str:
-    lineas: List[str] = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//Organizador Academico IA//ES//",
-        "CALSCALE:GREGORIAN"
+
+def _escapar(texto: str) -> str:
+    """Escapa un valor TEXT (RFC 5545 3.3.11): barra invertida, ';', ',' y saltos de línea."""
+    return (
+        texto.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _plegar(linea: str) -> str:
+    """
+    Pliega una línea de contenido a 75 octetos (RFC 5545 3.1): las
+    continuaciones parten con un espacio. Nunca corta un carácter UTF-8.
+    """
+    datos = linea.encode("utf-8")
+    if len(datos) <= MAX_OCTETOS_LINEA:
+        return linea
+    partes = []
+    inicio, maximo = 0, MAX_OCTETOS_LINEA
+    while len(datos) - inicio > maximo:
+        fin = inicio + maximo
+        # Retrocede si cae sobre un byte de continuación (10xxxxxx)
+        while datos[fin] & 0xC0 == 0x80:
+            fin -= 1
+        partes.append(datos[inicio:fin].decode("utf-8"))
+        # Las continuaciones llevan un espacio adelante, que también cuenta
+        inicio, maximo = fin, MAX_OCTETOS_LINEA - 1
+    partes.append(datos[inicio:].decode("utf-8"))
+    return (CRLF + " ").join(partes)
+
+
+def _offset_ical(delta: timedelta) -> str:
+    segundos = int(delta.total_seconds())
+    signo = "-" if segundos < 0 else "+"
+    h, resto = divmod(abs(segundos), 3600)
+    m, seg = divmod(resto, 60)
+    return f"{signo}{h:02d}{m:02d}" + (f"{seg:02d}" if seg else "")
+
+
+def _componente_tz(zona, antes: datetime, despues: datetime) -> str:
+    """STANDARD/DAYLIGHT para el cambio de offset entre dos instantes UTC."""
+    local = despues.astimezone(zona)
+    desde, hacia = antes.astimezone(zona).utcoffset(), local.utcoffset()
+    tipo = "DAYLIGHT" if local.dst() else "STANDARD"
+    # DTSTART es la hora local (con el offset anterior) en que ocurre el cambio
+    inicio = (despues + desde).replace(tzinfo=None)
+    return CRLF.join([
+        f"BEGIN:{tipo}",
+        f"DTSTART:{inicio.strftime('%Y%m%dT%H%M%S')}",
+        f"TZOFFSETFROM:{_offset_ical(desde)}",
+        f"TZOFFSETTO:{_offset_ical(hacia)}",
+        f"TZNAME:{local.tzname()}",
+        f"END:{tipo}",
+    ]) + CRLF
+
+
+@lru_cache(maxsize=8)
+def _vtimezone(zona_horaria: str, desde: int, hasta: int) -> str:
+    """
+    Bloque VTIMEZONE de la zona entre los años desde y hasta, con una
+    componente por cada cambio de horario (se buscan día a día y se afinan
+    al segundo). "" si la zona no está en la base de zoneinfo.
+    """
+    if ZoneInfo is None:
+        return ""
+    try:
+        zona = ZoneInfo(zona_horaria)
+    except Exception:
+        return ""
+
+    dia = timedelta(days=1)
+    t = datetime(desde, 1, 1, tzinfo=timezone.utc)
+    fin = datetime(hasta + 1, 1, 1, tzinfo=timezone.utc)
+    componentes = [_componente_tz(zona, t, t)]
+    while t < fin:
+        siguiente = t + dia
+        if t.astimezone(zona).utcoffset() != siguiente.astimezone(zona).utcoffset():
+            antes, despues = t, siguiente
+            while despues - antes > timedelta(seconds=1):
+                medio = antes + (despues - antes) / 2
+                if medio.astimezone(zona).utcoffset() == antes.astimezone(zona).utcoffset():
+                    antes = medio
+                else:
+                    despues = medio
+            despues = despues.replace(microsecond=0)
+            componentes.append(_componente_tz(zona, antes, despues))
+        t = siguiente
+    return f"BEGIN:VTIMEZONE{CRLF}TZID:{zona_horaria}{CRLF}" + "".join(componentes) + f"END:VTIMEZONE{CRLF}"
+
+
+def _clave_curso(plan: PlanEstudio) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "", plan.curso.codigo or plan.curso.nombre or "") or "curso"
+
+
+def _dia_ical(fecha: str) -> str:
+    """YYYYMMDD de la fecha, o "" si no se puede leer."""
+    try:
+        return _dt_ical(fecha, "")[:8]
+    except ValueError:
+        return ""
+
+
+def _años_eventos(planes: Sequence[PlanEstudio], anterior: Dict[str, Dict[str, Any]], por_defecto: int) -> Tuple[int, int]:
+    """
+    Primer y último año del semestre de los planes y de las cancelaciones
+    pendientes; sin ninguna fecha legible, por_defecto.
+    """
+    dias = [_dia_ical(f) for plan in planes for f in (plan.configuracion.fecha_inicio, plan.configuracion.fecha_fin)]
+    dias.extend(previo["dtstart"][:8] for previo in anterior.values() if not previo.get("cancelado"))
+    años = [int(d[:4]) for d in dias if d]
+    return (min(años), max(años)) if años else (por_defecto, por_defecto)
+
+
+def _huella(*partes: str) -> str:
+    return hashlib.sha1("\0".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+def _evento(
+    uid: str,
+    dtstamp: str,
+    dtstart: str,
+    dtend: str,
+    resumen: str,
+    descripcion: str,
+    secuencia: int = 0,
+    cancelado: bool = False,
+) -> str:
+    lineas = [
+        "BEGIN:VEVENT",
+        _plegar(f"UID:{uid}"),
+        f"DTSTAMP:{dtstamp}",
+        f"SEQUENCE:{secuencia}",
+        f"DTSTART;TZID={ZONA_HORARIA}:{dtstart}",
+        f"DTEND;TZID={ZONA_HORARIA}:{dtend}",
+        _plegar(f"SUMMARY:{_escapar(resumen)}"),
+        _plegar(f"DESCRIPTION:{_escapar(descripcion)}"),
     ]
+    if cancelado:
+        lineas.append("STATUS:CANCELLED")
+    lineas.append("END:VEVENT")
+    return CRLF.join(lineas) + CRLF
+
+
+def iterar_ics(
+    planes: Iterable[PlanEstudio],
+    dtstamp: Optional[datetime] = None,
+    prefijo_curso: bool = False,
+    anterior: Optional[Dict[str, Dict[str, Any]]] = None,
+    estado: Optional[Dict[str, Dict[str, Any]]] = None,
+    solo_cambios: bool = False,
+) -> Iterator[str]:
+    """
+    Calendario iCalendar de uno o varios planes, por trozos: la cabecera
+    con el VTIMEZONE de ZONA_HORARIA (para los años del semestre de los
+    planes), un trozo por evento y el cierre, con fin de línea CRLF. No arma
+    el archivo completo en memoria ni guarda nada por sesión (salvo `estado`
+    si se pide), así que sirve para calendarios de miles de eventos. Los
+    planes se recorren dos veces: un iterador de un solo uso se pasa antes a
+    lista. Con prefijo_curso el título de cada evento parte con "[código]".
+
+    El UID de cada sesión sale del ramo, la fecha y la hora de inicio, así
+    que no cambia al regenerar o reajustar el plan. Con `anterior` (el
+    `estado` de la exportación previa) cada evento cuyo contenido cambió
+    sube su SEQUENCE y toma un DTSTAMP nuevo; los que siguen iguales
+    conservan ambos, y los que ya no están salen con STATUS:CANCELLED.
+    Con solo_cambios se omiten los eventos sin cambios. Si se pasa `estado`
+    (un dict vacío), queda lleno con lo exportado al terminar de iterar;
+    sin él no se guarda nada por evento.
+    """
+    ahora = (dtstamp or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    dtstamp = ahora.strftime("%Y%m%dT%H%M%SZ")
+    anterior = anterior or {}
+    vistos = set()
+    # El VTIMEZONE va antes de los eventos y cubre los años del semestre de
+    # cada plan: se leen sus fechas sin recorrer las sesiones
+    if not isinstance(planes, Sequence):
+        planes = list(planes)
+    desde, hasta = _años_eventos(planes, anterior, ahora.year)
+    yield _CABECERA + _vtimezone(ZONA_HORARIA, desde, hasta)
+
+    # Dos sesiones del mismo ramo a la misma hora se distinguen por orden.
+    # Una sesión que cae en el rango de su semana, y después del de las
+    # semanas anteriores, no puede coincidir con la de otra semana: esas se
+    # cuentan por semana. Las que caen fuera (raras) se cuentan en todo el
+    # ramo y con otra marca, así el contador nunca crece con el calendario.
+    # ramo -> [último día cubierto por sus semanas, contador de las de fuera]
+    por_ramo = {}
+    for plan in planes:
+        curso = _clave_curso(plan)
+        prefijo = f"[{plan.curso.codigo or plan.curso.nombre}] " if prefijo_curso else ""
+        ramo = por_ramo.setdefault(curso, ["", {}])
+        for semana in plan.semanas:
+            desde_semana = _dia_ical(semana.rango_fechas.inicio)
+            hasta_semana = _dia_ical(semana.rango_fechas.fin)
+            por_horario = {}
+            for sesion in semana.sesiones:
+                dtstart = _dt_ical(sesion.fecha, sesion.inicio)
+                dtend = _dt_ical(sesion.fecha, sesion.fin)
+                resumen = prefijo + (sesion.titulo or "Sesion de estudio")
+                descripcion = []
+                if sesion.temas:
+                    descripcion.append("Temas: " + ", ".join(sesion.temas))
+                if sesion.output:
+                    descripcion.append("Objetivo: " + sesion.output)
+                descripcion = "\n".join(descripcion)
+
+                if ramo[0] < dtstart[:8] and desde_semana <= dtstart[:8] <= hasta_semana:
+                    contador, marca = por_horario, ""
+                else:
+                    contador, marca = ramo[1], "fuera"
+                n = contador[dtstart] = contador.get(dtstart, 0) + 1
+                uid = f"{_huella(curso, dtstart, marca + str(n))}.{curso}@organizador-ia"
+                huella = _huella(dtend, resumen, descripcion)
+
+                previo = anterior.get(uid)
+                if previo and previo["huella"] == huella and not previo.get("cancelado"):
+                    secuencia, sello, cambio = previo["secuencia"], previo["dtstamp"], False
+                else:
+                    secuencia, sello, cambio = (previo["secuencia"] + 1 if previo else 0), dtstamp, True
+                if anterior:
+                    vistos.add(uid)
+                if estado is not None:
+                    estado[uid] = {
+                        "secuencia": secuencia, "huella": huella, "dtstamp": sello,
+                        "dtstart": dtstart, "dtend": dtend, "resumen": resumen, "cancelado": False,
+                    }
+                if cambio or not solo_cambios:
+                    yield _evento(uid, sello, dtstart, dtend, resumen, descripcion, secuencia)
+            ramo[0] = max(ramo[0], hasta_semana)
 
-    uid_contador = 0
-
-    for semana in plan.semanas:
-        for sesion in semana.sesiones:
-            uid_contador += 1
-            dtstart = _dt_ical(sesion.fecha, sesion.inicio)
-            dtend = _dt_ical(sesion.fecha, sesion.fin)
-
-            resumen = sesion.titulo or "Sesion de estudio"
-            descripcion = ""
-            if sesion.temas:
-                descripcion += "Temas: " + ", ".join(sesion.temas) + "\\n"
-            if sesion.output:
-                descripcion += "Objetivo: " + sesion.output
-            uid = sesion.id or f"W{semana.numero:02d}-S{uid_contador:02d}"
-
-            lineas.extend([
-                "BEGIN:VEVENT",
-                f"UID:{uid}@organizador-ia",
-                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%S')}",
-                f"DTSTART;TZID={ZONA_HORARIA}:{dtstart}",
-                f"DTEND;TZID={ZONA_HORARIA}:{dtend}",
-                f"SUMMARY:{resumen}",
-                f"DESCRIPTION:{descripcion}",
-                "END:VEVENT"
-            ])
-
-    lineas.append("END:VCALENDAR")
-    return "\n".join(lineas)
+    for uid, previo in anterior.items():
+        if uid in vistos:
+            continue
+        if previo.get("cancelado"):
+            if estado is not None:
+                estado[uid] = previo
+            continue
+        if estado is not None:
+            estado[uid] = dict(previo, secuencia=previo["secuencia"] + 1, dtstamp=dtstamp, cancelado=True)
+        yield _evento(
+            uid, dtstamp, previo["dtstart"], previo["dtend"], previo["resumen"], "",
+            previo["secuencia"] + 1, cancelado=True,
+        )
+    yield _PIE
+
+
+def escribir_ics(planes: Iterable[PlanEstudio], destino: Union[IO[str], IO[bytes]], **opciones) -> None:
+    """
+    Escribe el calendario en un archivo abierto a medida que se genera
+    (`opciones` como en iterar_ics). Un archivo de texto debe abrirse con
+    newline="" para no alterar los CRLF.
+    """
+    binario = isinstance(destino, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(destino, "mode", "")
+    for trozo in iterar_ics(planes, **opciones):
+        destino.write(trozo.encode("utf-8") if binario else trozo)
+
+
+def generar_ics_desde_plan(plan: PlanEstudio) -> str:
+    return "".join(iterar_ics([plan]))
+
+
+def generar_ics_semestre(planes: Iterable[PlanEstudio]) -> str:
+    """Un solo calendario con los planes de todos los ramos."""
+    return "".join(iterar_ics(planes, prefijo_curso=True))
+
+
+def exportar_ics(
+    planes: Iterable[PlanEstudio],
+    anterior: Optional[Dict[str, Dict[str, Any]]] = None,
+    solo_cambios: bool = False,
+    prefijo_curso: bool = False,
+) -> Tuple[str, Dict[str, Dict[str, Any]], int]:
+    """
+    Exportación incremental: (calendario, estado para la próxima vez,
+    cantidad de eventos nuevos, modificados o cancelados).
+    """
+    estado: Dict[str, Dict[str, Any]] = {}
+    texto = "".join(iterar_ics(
+        planes, prefijo_curso=prefijo_curso, anterior=anterior, estado=estado, solo_cambios=solo_cambios
+    ))
+    anterior = anterior or {}
+    cambios = sum(
+        1 for uid, ev in estado.items()
+        if uid not in anterior or ev["secuencia"] != anterior[uid]["secuencia"]
+    )
+    return texto, estado, cambios
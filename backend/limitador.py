@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from .parametros import LIMITES_GEMINI, LIMITE_GEMINI_POR_DEFECTO
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación barata: ~4 caracteres por token en español/inglés."""
+    return len(texto or "") // 4 + 1
+
+
+class LimitadorCuota:
+    """
+    Token bucket doble para un modelo: requests por minuto (RPM) y tokens
+    por minuto (TPM). Cada llamada reserva 1 request y sus tokens estimados;
+    si no alcanza, espera justo lo necesario para que se recarguen.
+    Después de un 429, penalizar() frena a todos los que usan ese modelo.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self._requests = self.rpm
+        self._tokens = self.tpm
+        self._ultimo = time.monotonic()
+        self._bloqueado_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def _recargar(self, ahora: float) -> None:
+        dt = ahora - self._ultimo
+        self._ultimo = ahora
+        self._requests = min(self.rpm, self._requests + dt * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + dt * self.tpm / 60.0)
+
+    def _reservar(self, tokens: int) -> float:
+        """Reserva si hay cupo (devuelve 0) o devuelve cuántos segundos esperar."""
+        with self._lock:
+            ahora = time.monotonic()
+            self._recargar(ahora)
+            if ahora < self._bloqueado_hasta:
+                return self._bloqueado_hasta - ahora
+
+            # Un prompt más grande que el TPM nunca cabría: se limita al balde lleno
+            tokens = min(tokens, self.tpm)
+            espera_req = max(0.0, 1 - self._requests) * 60.0 / self.rpm
+            espera_tok = max(0.0, tokens - self._tokens) * 60.0 / self.tpm
+            espera = max(espera_req, espera_tok)
+            if espera > 0:
+                return espera
+
+            self._requests -= 1
+            self._tokens -= tokens
+            return 0.0
+
+    def adquirir(self, tokens: int = 1) -> None:
+        while (espera := self._reservar(tokens)) > 0:
+            time.sleep(espera)
+
+    async def adquirir_async(self, tokens: int = 1) -> None:
+        while (espera := self._reservar(tokens)) > 0:
+            await asyncio.sleep(espera)
+
+    def penalizar(self, segundos: float) -> None:
+        with self._lock:
+            self._bloqueado_hasta = max(self._bloqueado_hasta, time.monotonic() + segundos)
+            self._requests = 0.0
+
+
+_limitadores: Dict[str, LimitadorCuota] = {}
+_lock_registro = threading.Lock()
+
+
+def obtener_limitador(modelo: str) -> LimitadorCuota:
+    """Un limitador por modelo, compartido por todo el proceso."""
+    with _lock_registro:
+        if modelo not in _limitadores:
+            rpm, tpm = LIMITES_GEMINI.get(modelo, LIMITE_GEMINI_POR_DEFECTO)
+            _limitadores[modelo] = LimitadorCuota(rpm, tpm)
+        return _limitadores[modelo]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Literal
 from .parametros import ZONA_HORARIA
 
@@ -33,11 +33,32 @@ class SesionPlan(BaseModel):
     fecha: str
     inicio: str
     fin: str
-    duracion_minutos: int
+    duracion_minutos: int = 60
     tipo: TipoSesion
     temas: List[str]
     output: Optional[str] = None
     prioridad: int = Field(1, ge=1, le=3)
+    # Duración planificada antes de ajustarla por el ánimo del día (None = sin ajuste)
+    duracion_base: Optional[int] = None
+
+    # El modelo a veces se sale de rango o manda texto: se acota en vez de fallar
+    @field_validator("duracion_minutos", mode="before")
+    @classmethod
+    def _acotar_duracion(cls, v):
+        try:
+            d = int(v)
+        except (TypeError, ValueError):
+            d = 60
+        return max(30, min(240, d))
+
+    @field_validator("prioridad", mode="before")
+    @classmethod
+    def _acotar_prioridad(cls, v):
+        try:
+            p = int(v)
+        except (TypeError, ValueError):
+            p = 1
+        return max(1, min(3, p))
 
 class RangoFechas(BaseModel):
     inicio: str
@@ -56,3 +77,17 @@ class PlanEstudio(BaseModel):
     configuracion: ConfiguracionPlan
     resumen: ResumenPlan
     semanas: List[SemanaPlan]
+
+AccionCambio = Literal["agregada", "eliminada", "modificada"]
+
+class CambioSesion(BaseModel):
+    semana: int
+    accion: AccionCambio
+    id: str
+    antes: Optional[SesionPlan] = None
+    despues: Optional[SesionPlan] = None
+
+class DiffPlan(BaseModel):
+    desde: str
+    semanas_afectadas: List[int] = Field(default_factory=list)
+    cambios: List[CambioSesion] = Field(default_factory=list)
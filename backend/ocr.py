@@ -0,0 +1,139 @@
+# type:ignore
+import atexit
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+try:
+    from PIL import Image, ImageOps
+except Exception:
+    Image = None
+    ImageOps = None
+
+try:
+    import pytesseract
+except Exception:
+    pytesseract = None
+
+from .parametros import OCR_MAX_LADO, OCR_TIMEOUT_S, OCR_WORKERS, OCR_IDIOMA
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def ocr_disponible() -> bool:
+    return Image is not None and pytesseract is not None
+
+
+def _umbral_otsu(histograma: List[int]) -> int:
+    """Umbral que mejor separa tinta y fondo en un histograma de grises."""
+    total = sum(histograma)
+    suma_total = sum(i * h for i, h in enumerate(histograma))
+    suma_fondo, peso_fondo = 0.0, 0
+    mejor, umbral = 0.0, 127
+    for i, h in enumerate(histograma):
+        peso_fondo += h
+        if peso_fondo == 0:
+            continue
+        peso_tinta = total - peso_fondo
+        if peso_tinta == 0:
+            break
+        suma_fondo += i * h
+        media_fondo = suma_fondo / peso_fondo
+        media_tinta = (suma_total - suma_fondo) / peso_tinta
+        varianza = peso_fondo * peso_tinta * (media_fondo - media_tinta) ** 2
+        if varianza > mejor:
+            mejor, umbral = varianza, i
+    return umbral
+
+
+def preprocesar_imagen(img):
+    """
+    Deja la imagen lista para Tesseract: respeta la rotación EXIF, la achica
+    a OCR_MAX_LADO píxeles por lado (las fotos del celular vienen a 4000+),
+    la pasa a grises y la binariza con un umbral de Otsu.
+    """
+    # En JPEG el decodificador ya entrega la imagen reducida y en grises
+    img.draft("L", (OCR_MAX_LADO, OCR_MAX_LADO))
+    gris = ImageOps.exif_transpose(img).convert("L")
+    if max(gris.size) > OCR_MAX_LADO:
+        gris.thumbnail((OCR_MAX_LADO, OCR_MAX_LADO), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    gris = ImageOps.autocontrast(gris)
+    umbral = _umbral_otsu(gris.histogram())
+    return gris.point([255 if i > umbral else 0 for i in range(256)])
+
+
+def ocr_imagen(img, timeout: Optional[float] = None) -> str:
+    """
+    OCR de una imagen PIL ya abierta. Si Tesseract se pasa de `timeout`
+    segundos (o falla) devuelve "" en vez de bloquear la extracción.
+    """
+    if not ocr_disponible():
+        return ""
+    timeout = OCR_TIMEOUT_S if timeout is None else timeout
+    try:
+        img = preprocesar_imagen(img)
+    except Exception:
+        pass
+    try:
+        return pytesseract.image_to_string(img, lang=OCR_IDIOMA or None, timeout=timeout).strip()
+    except pytesseract.TesseractError:
+        # Idioma no instalado: se reintenta con el idioma por defecto
+        if not OCR_IDIOMA:
+            return ""
+        try:
+            return pytesseract.image_to_string(img, timeout=timeout).strip()
+        except Exception:
+            return ""
+    except Exception:
+        return ""
+
+
+def ocr_bytes(data) -> str:
+    if not ocr_disponible():
+        return ""
+    try:
+        return ocr_imagen(Image.open(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data))
+    except Exception:
+        return ""
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    # Tesseract corre como subproceso, así que los hilos sí trabajan en paralelo
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=OCR_WORKERS or None, thread_name_prefix="ocr")
+        return _pool
+
+
+def ocr_varias(datos: List[bytes]) -> List[str]:
+    """OCR de varias imágenes (bytes) en paralelo, en el mismo orden."""
+    if not datos or not ocr_disponible():
+        return [""] * len(datos)
+    if len(datos) == 1:
+        return [ocr_bytes(datos[0])]
+    return list(_obtener_pool().map(ocr_bytes, datos))
+
+
+def ocr_pagina_pdf(pagina) -> str:
+    """Texto de una página escaneada (sin capa de texto) vía OCR de sus imágenes."""
+    if not ocr_disponible():
+        return ""
+    try:
+        datos = [imagen.data for imagen in pagina.images]
+    except Exception:
+        return ""
+    return "\n".join(t for t in ocr_varias(datos) if t).strip()
+
+
+def cerrar_pool_ocr() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(cerrar_pool_ocr)
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,3 +10,72 @@ GEMINI_MODEL_RESUMEN = os.getenv("GEMINI_MODEL_RESUMEN", "gemini-2.0-flash")
 GEMINI_MODEL_PLAN = os.getenv("GEMINI_MODEL_PLAN", "gemini-2.5-flash")
 
 ZONA_HORARIA = os.getenv("ZONA_HORARIA", "America/Santiago")
+
+# Cuota de Gemini por modelo: (requests por minuto, tokens por minuto)
+LIMITES_GEMINI = {
+    GEMINI_MODEL_RESUMEN: (
+        float(os.getenv("GEMINI_RPM_RESUMEN", "15")),
+        float(os.getenv("GEMINI_TPM_RESUMEN", "1000000")),
+    ),
+    GEMINI_MODEL_PLAN: (
+        float(os.getenv("GEMINI_RPM_PLAN", "10")),
+        float(os.getenv("GEMINI_TPM_PLAN", "250000")),
+    ),
+}
+LIMITE_GEMINI_POR_DEFECTO = (10.0, 250000.0)
+
+# Planes que se generan a la vez como trabajos de fondo (Front-end/jobs.py).
+# Pasan casi todo el tiempo esperando a Gemini y el limitador reparte la
+# cuota entre ellos, así que el techo real lo ponen las RPM/TPM de arriba
+PLAN_JOBS_WORKERS = int(os.getenv("PLAN_JOBS_WORKERS", "3"))
+
+# Conexiones HTTP del cliente compartido de Gemini
+GEMINI_MAX_CONEXIONES = int(os.getenv("GEMINI_MAX_CONEXIONES", "20"))
+GEMINI_KEEPALIVE_S = float(os.getenv("GEMINI_KEEPALIVE_S", "60"))
+
+# Cache persistente (vive junto a ramos_uc.db)
+CACHE_DB_PATH = os.getenv(
+    "CACHE_DB_PATH",
+    str(Path(__file__).resolve().parent.parent / "Front-end" / "cache_smartsemester.db"),
+)
+CACHE_EXTRACCION_MAX_ENTRADAS = int(os.getenv("CACHE_EXTRACCION_MAX_ENTRADAS", "500"))
+CACHE_EXTRACCION_MAX_MB = float(os.getenv("CACHE_EXTRACCION_MAX_MB", "200"))
+
+# Cache de respuestas del modelo (mismo modelo + mismo prompt = misma respuesta)
+CACHE_LLM_DESACTIVADO = os.getenv("CACHE_LLM_DESACTIVADO", "0").lower() in ("1", "true", "si", "sí")
+CACHE_LLM_TTL_HORAS = float(os.getenv("CACHE_LLM_TTL_HORAS", "72"))
+CACHE_LLM_MAX_ENTRADAS = int(os.getenv("CACHE_LLM_MAX_ENTRADAS", "1000"))
+CACHE_LLM_MAX_MB = float(os.getenv("CACHE_LLM_MAX_MB", "50"))
+
+# Extracción en paralelo (0 = un worker por núcleo)
+EXTRACCION_WORKERS = int(os.getenv("EXTRACCION_WORKERS", "0"))
+EXTRACCION_TIMEOUT_S = float(os.getenv("EXTRACCION_TIMEOUT_S", "120"))
+EXTRACCION_PAGINAS_POR_TAREA = int(os.getenv("EXTRACCION_PAGINAS_POR_TAREA", "8"))
+# Con presupuesto de caracteres, cuántas veces el presupuesto se lee antes de cortar
+EXTRACCION_FACTOR_EXPLORACION = float(os.getenv("EXTRACCION_FACTOR_EXPLORACION", "3"))
+
+# Si es 1, el plan local (fechas/horas de cada sesión) se manda al modelo como base y él solo lo refina
+PLAN_ESQUELETO_LOCAL = os.getenv("PLAN_ESQUELETO_LOCAL", "0").lower() in ("1", "true", "si", "sí")
+
+# Resúmenes de programa/apuntes: por defecto extractivos y locales; con 1 se piden a Gemini
+RESUMEN_CON_IA = os.getenv("RESUMEN_CON_IA", "0").lower() in ("1", "true", "si", "sí")
+
+# Presupuesto de tokens del prompt del plan por modelo (instrucciones + datos + material)
+PRESUPUESTOS_PROMPT = {
+    GEMINI_MODEL_PLAN: int(os.getenv("PRESUPUESTO_TOKENS_PLAN", "3000")),
+}
+PRESUPUESTO_PROMPT_POR_DEFECTO = 3000
+
+# OCR: lado máximo en píxeles tras achicar, timeout por imagen, hilos (0 = automático) e idioma de Tesseract
+OCR_MAX_LADO = int(os.getenv("OCR_MAX_LADO", "2000"))
+OCR_TIMEOUT_S = float(os.getenv("OCR_TIMEOUT_S", "30"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+OCR_IDIOMA = os.getenv("OCR_IDIOMA", "spa+eng")
+# Páginas de PDF sin capa de texto (escaneadas) pasan por OCR de sus imágenes
+OCR_PDF_ESCANEADOS = os.getenv("OCR_PDF_ESCANEADOS", "1").lower() in ("1", "true", "si", "sí")
+
+# Feed .ics local para suscribirse desde la app de calendario (puerto 0 = sin servidor)
+FEED_ICS_HOST = os.getenv("FEED_ICS_HOST", "127.0.0.1")
+FEED_ICS_PUERTO = int(os.getenv("FEED_ICS_PUERTO", "8765"))
+# URL con la que los clientes ven el servidor (si está detrás de un proxy); vacío = http://host:puerto
+FEED_ICS_URL_BASE = os.getenv("FEED_ICS_URL_BASE", "")
@@ -0,0 +1,69 @@
+from typing import List
+
+
+class ParserSemanasIncremental:
+    """
+    Recibe el JSON del plan en trozos (tal como llega del stream del modelo)
+    y entrega el texto de cada objeto del arreglo "semanas" apenas se cierra,
+    sin esperar el documento completo.
+    Cada carácter se revisa una sola vez; lo que venga fuera del objeto raíz
+    (p.ej. las cercas ```json) se ignora.
+    """
+
+    def __init__(self):
+        self._texto = ""
+        self._pos = 0
+        self._profundidad = 0
+        self._en_string = False
+        self._escape = False
+        self._inicio_string = -1
+        self._ultima_clave = None
+        self._nivel_semanas = None  # profundidad dentro del arreglo "semanas"
+        self._inicio_semana = -1
+
+    def alimentar(self, trozo: str) -> List[str]:
+        """Agrega un trozo y devuelve el JSON de las semanas que se completaron."""
+        if not trozo:
+            return []
+        self._texto += trozo
+        completas = []
+        texto = self._texto
+
+        for i in range(self._pos, len(texto)):
+            c = texto[i]
+
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_string = False
+                    if self._profundidad == 1:
+                        self._ultima_clave = texto[self._inicio_string + 1:i]
+                continue
+
+            if c == '"':
+                self._en_string = True
+                self._inicio_string = i
+            elif c in "{[":
+                if c == "[" and self._profundidad == 1 and self._ultima_clave == "semanas":
+                    self._nivel_semanas = self._profundidad + 1
+                elif c == "{" and self._nivel_semanas is not None and self._profundidad == self._nivel_semanas:
+                    self._inicio_semana = i
+                self._profundidad += 1
+            elif c in "}]":
+                self._profundidad -= 1
+                if self._nivel_semanas is not None:
+                    if c == "}" and self._profundidad == self._nivel_semanas and self._inicio_semana >= 0:
+                        completas.append(texto[self._inicio_semana:i + 1])
+                        self._inicio_semana = -1
+                    elif c == "]" and self._profundidad == self._nivel_semanas - 1:
+                        self._nivel_semanas = None
+
+        self._pos = len(texto)
+        return completas
+
+    def texto(self) -> str:
+        """Todo lo recibido hasta ahora."""
+        return self._texto
@@ -0,0 +1,188 @@
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, get_args
+
+from .modelos import PlanEstudio, SesionPlan, TipoSesion
+
+TIPOS_SESION = get_args(TipoSesion)
+_TIPO_INDICE = {t: i for i, t in enumerate(TIPOS_SESION)}
+
+_FORMATOS_FECHA = ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d")
+_FECHA_CRUDA = 0           # ordinal reservado: la fecha no se pudo leer
+_HORA_CRUDA = 0xFFFF       # minuto reservado: la hora no se pudo leer
+_SIN_TEXTO = 0xFFFFFFFF    # índice reservado: output = None
+
+
+def _ordinal(fecha: str) -> int:
+    for fmt in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(fecha.strip(), fmt).toordinal()
+        except (ValueError, AttributeError):
+            continue
+    return _FECHA_CRUDA
+
+
+def _minutos(hora: str) -> int:
+    try:
+        h, m = hora.strip().split(":")[:2]
+        h, m = int(h), int(m)
+    except (ValueError, AttributeError):
+        return _HORA_CRUDA
+    return h * 60 + m if 0 <= h < 24 and 0 <= m < 60 else _HORA_CRUDA
+
+
+def _texto_fecha(ordinal: int) -> str:
+    d = date.fromordinal(ordinal)
+    return "%02d-%02d-%04d" % (d.day, d.month, d.year)
+
+
+def _texto_hora(minutos: int) -> str:
+    return "%02d:%02d" % divmod(minutos, 60)
+
+
+class PlanCompacto:
+    """
+    Plan de solo lectura guardado por columnas: cada campo de las sesiones
+    es un array compacto (fechas como ordinales, horas como minutos, tipo
+    como índice) y cada texto distinto va una sola vez, en UTF-8, a un único
+    bloque de bytes (sin un objeto str por texto).
+    Ocupa una fracción de un PlanEstudio con sus SesionPlan y filtra por
+    rango de fechas con búsqueda binaria.
+    Las fechas y horas que no vienen como DD-MM-YYYY y HH:MM se guardan
+    aparte tal cual, así a_plan() devuelve exactamente el plan original.
+    """
+
+    __slots__ = (
+        "_meta", "_semanas", "_textos", "_textos_desde",
+        "_semana", "_fecha", "_inicio", "_fin", "_duracion", "_prioridad", "_tipo",
+        "_duracion_base", "_id", "_titulo", "_output", "_temas_desde", "_temas",
+        "_orden", "_fechas_ordenadas", "_crudos",
+    )
+
+    def __init__(self):
+        self._meta: Dict[str, Any] = {}
+        self._semanas = array("I")   # semana sin sesiones, como JSON en el bloque de textos
+        self._textos = b""
+        self._textos_desde = array("I", [0])
+        self._semana = array("H")
+        self._fecha = array("I")
+        self._inicio = array("H")
+        self._fin = array("H")
+        self._duracion = array("H")
+        self._duracion_base = array("H")   # 0 = None
+        self._prioridad = array("B")
+        self._tipo = array("B")
+        self._id = array("I")
+        self._titulo = array("I")
+        self._output = array("I")
+        self._temas_desde = array("I", [0])
+        self._temas = array("I")
+        self._orden = array("I")
+        self._fechas_ordenadas = array("I")
+        # (posición, campo) -> texto original de fechas/horas fuera del formato canónico
+        self._crudos: Dict[Tuple[int, str], str] = {}
+
+    @classmethod
+    def desde_plan(cls, plan: PlanEstudio) -> "PlanCompacto":
+        c = cls()
+        textos: Dict[str, int] = {}
+        bloque = bytearray()
+
+        def texto(s: str) -> int:
+            i = textos.get(s)
+            if i is None:
+                i = textos[s] = len(textos)
+                bloque.extend(s.encode("utf-8"))
+                c._textos_desde.append(len(bloque))
+            return i
+
+        c._meta = plan.model_dump(include={"curso", "configuracion", "resumen"})
+        for w, semana in enumerate(plan.semanas):
+            c._semanas.append(texto(semana.model_dump_json(exclude={"sesiones"})))
+            for sesion in semana.sesiones:
+                pos = len(c._fecha)
+                ordinal = _ordinal(sesion.fecha)
+                inicio, fin = _minutos(sesion.inicio), _minutos(sesion.fin)
+                if ordinal == _FECHA_CRUDA or _texto_fecha(ordinal) != sesion.fecha:
+                    c._crudos[(pos, "fecha")] = sesion.fecha
+                if inicio == _HORA_CRUDA or _texto_hora(inicio) != sesion.inicio:
+                    c._crudos[(pos, "inicio")] = sesion.inicio
+                if fin == _HORA_CRUDA or _texto_hora(fin) != sesion.fin:
+                    c._crudos[(pos, "fin")] = sesion.fin
+                c._semana.append(w)
+                c._fecha.append(ordinal)
+                c._inicio.append(inicio)
+                c._fin.append(fin)
+                c._duracion.append(sesion.duracion_minutos)
+                c._duracion_base.append(sesion.duracion_base or 0)
+                c._prioridad.append(sesion.prioridad)
+                c._tipo.append(_TIPO_INDICE[sesion.tipo])
+                c._id.append(texto(sesion.id))
+                c._titulo.append(texto(sesion.titulo))
+                c._output.append(_SIN_TEXTO if sesion.output is None else texto(sesion.output))
+                c._temas.extend(texto(t) for t in sesion.temas)
+                c._temas_desde.append(len(c._temas))
+        c._textos = bytes(bloque)
+
+        orden = sorted(range(len(c._fecha)), key=lambda i: (c._fecha[i], c._inicio[i]))
+        c._orden = array("I", orden)
+        c._fechas_ordenadas = array("I", (c._fecha[i] for i in orden))
+        return c
+
+    def __len__(self) -> int:
+        return len(self._fecha)
+
+    def _texto(self, i: int) -> str:
+        return self._textos[self._textos_desde[i]:self._textos_desde[i + 1]].decode("utf-8")
+
+    def _sesion_dict(self, i: int) -> Dict[str, Any]:
+        texto = self._texto
+        crudos = self._crudos
+        fecha = crudos[(i, "fecha")] if (i, "fecha") in crudos else _texto_fecha(self._fecha[i])
+        inicio = crudos[(i, "inicio")] if (i, "inicio") in crudos else _texto_hora(self._inicio[i])
+        fin = crudos[(i, "fin")] if (i, "fin") in crudos else _texto_hora(self._fin[i])
+        output = self._output[i]
+        return {
+            "id": texto(self._id[i]),
+            "titulo": texto(self._titulo[i]),
+            "fecha": fecha,
+            "inicio": inicio,
+            "fin": fin,
+            "duracion_minutos": self._duracion[i],
+            "tipo": TIPOS_SESION[self._tipo[i]],
+            "temas": [texto(t) for t in self._temas[self._temas_desde[i]:self._temas_desde[i + 1]]],
+            "output": None if output == _SIN_TEXTO else texto(output),
+            "prioridad": self._prioridad[i],
+            "duracion_base": self._duracion_base[i] or None,
+        }
+
+    def a_plan(self) -> PlanEstudio:
+        semanas = [dict(json.loads(self._texto(s)), sesiones=[]) for s in self._semanas]
+        for i in range(len(self)):
+            semanas[self._semana[i]]["sesiones"].append(self._sesion_dict(i))
+        return PlanEstudio.model_validate({**self._meta, "semanas": semanas})
+
+    def _rango(self, desde: Optional[date], hasta: Optional[date]) -> range:
+        """Posiciones (en orden de fecha) con desde <= fecha <= hasta."""
+        fechas = self._fechas_ordenadas
+        # Las fechas sin leer (ordinal 0) quedan al principio y nunca entran en un rango
+        lo = bisect_left(fechas, max(desde.toordinal() if desde else 1, 1))
+        hi = bisect_right(fechas, hasta.toordinal()) if hasta else len(fechas)
+        return range(lo, hi)
+
+    def contar_entre(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        return len(self._rango(desde, hasta))
+
+    def minutos_entre(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        """Minutos de estudio planificados en el rango, sin armar sesiones."""
+        return sum(self._duracion[self._orden[k]] for k in self._rango(desde, hasta))
+
+    def iterar_entre(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> Iterator[Dict[str, Any]]:
+        """Sesiones del rango como dicts (como SesionPlan.model_dump()), por fecha y hora."""
+        for k in self._rango(desde, hasta):
+            yield self._sesion_dict(self._orden[k])
+
+    def sesiones_entre(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[SesionPlan]:
+        return [SesionPlan.model_validate(s) for s in self.iterar_entre(desde, hasta)]
@@ -1,37 +1,40 @@
 # type:ignore
-import base64
-import io
+import asyncio
 import json
 import re
-import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple, get_args
 
 
 from google import genai
 from google.genai import errors as genai_errors
 
-try:
-    import PyPDF2
-except Exception:
-    PyPDF2 = None
-
-try:
-    from PIL import Image
-except Exception:
-    Image = None
-
-try:
-    import pytesseract
-except Exception:
-    pytesseract = None
-
+from .asincronia import ejecutar
+from .cliente_gemini import obtener_cliente
+from .limitador import obtener_limitador, estimar_tokens
 from .gen_calendar import generar_ics_desde_plan
-from .parametros import GENAI_KEY, GEMINI_MODEL_RESUMEN, GEMINI_MODEL_PLAN, ZONA_HORARIA
-from .modelos import PlanEstudio
+from .parametros import (
+    GEMINI_MODEL_RESUMEN, GEMINI_MODEL_PLAN, ZONA_HORARIA,
+    PLAN_ESQUELETO_LOCAL, RESUMEN_CON_IA, CACHE_DB_PATH, CACHE_LLM_DESACTIVADO, CACHE_LLM_TTL_HORAS, CACHE_LLM_MAX_ENTRADAS, CACHE_LLM_MAX_MB,
+)
+from .modelos import Intensidad, PlanEstudio, SemanaPlan
+from .parser_plan import ParserSemanasIncremental
+from .planificador_local import generar_plan_local, esqueleto_para_prompt
+from .resumen_local import resumir_extractivo
+from .presupuesto import (
+    tokens_de, caracteres_para, caracteres_material, repartir_presupuesto, recortar_evaluaciones,
+)
+from .cache import CacheSQLite, clave_contenido
+from .extraccion import (
+    extraer_texto_de_entrada, extraer_texto_pdf_base64, ocr_imagen_base64,
+    extraer_textos_en_paralelo, estadisticas_cache_extraccion, tamano_entrada,
+)
 
 MODO_DEMO = True
 
+_cache_llm = None
+
 
 def _esquema_salida_textual() -> str:
     return f"""
@@ -108,116 +111,114 @@ def _recortar_lista_textos(textos: List[str], max_por_texto: int, max_total: int
     return out
 
 
-def _normalizar_fecha(fecha_str: str) -> str:
-    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%y", "%d/%m/%y"):
+_FORMATOS_FECHA = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%y", "%d/%m/%y")
+
+# Una sola pasada: fechas, tipos de evaluación, porcentajes y saltos de línea
+_PATRON_PROGRAMA = re.compile(
+    # El lookahead descarta rápido las posiciones que no pueden calzar con nada
+    r"(?=[\dcetCET\n])(?:"
+    r"(?P<fecha>\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b)"
+    r"|(?P<tipo>certamen|examen|control|tarea)"
+    # Un porcentaje no cruza de línea (como al buscarlo línea por línea), y los
+    # dígitos de una fecha ya los tomó el grupo fecha: "2026-04-05, 30%" es 30%
+    r"|(?P<pct>\d+(?:[.,]\d+)?)[^\S\n]*%"
+    r"|(?P<nl>\n))",
+    re.IGNORECASE,
+)
+_PRECEDENCIA_TIPO = ("certamen", "examen", "control", "tarea")
+
+
+@lru_cache(maxsize=4096)
+def _parsear_fecha(fecha_str: str):
+    for fmt in _FORMATOS_FECHA:
         try:
-            return datetime.strptime(fecha_str, fmt).strftime("%d-%m-%Y")
+            return datetime.strptime(fecha_str, fmt)
         except ValueError:
             pass
-    return ""
+    return None
 
 
-def extraer_info_programa(texto: str) -> Dict[str, Any]:
-    fechas_raw = re.findall(
-        r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b",
-        texto or ""
-    )
-    fechas = [_normalizar_fecha(f) for f in fechas_raw]
-    fechas = [f for f in fechas if f]
+@lru_cache(maxsize=4096)
+def _normalizar_fecha(fecha_str: str) -> str:
+    dt = _parsear_fecha(fecha_str)
+    return dt.strftime("%d-%m-%Y") if dt else ""
 
-    fechas_unique = sorted(set(fechas), key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
-    semestre = {}
-    if len(fechas_unique) >= 2:
-        semestre = {"fecha_inicio": fechas_unique[0], "fecha_fin": fechas_unique[-1]}
 
+def extraer_info_programa(texto: str) -> Dict[str, Any]:
+    """
+    Fechas del semestre (la primera y la última que aparecen) y evaluaciones:
+    líneas con una fecha y la palabra certamen/examen/control/tarea, con su
+    porcentaje si lo tienen. Recorre el texto una sola vez.
+    """
+    texto = texto or ""
+    fechas = set()
     evaluaciones = []
-    for linea in (texto or "").splitlines():
-        lower = linea.lower()
-        fechas_linea = re.findall(
-            r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b",
-            linea
-        )
-        if not fechas_linea:
-            continue
-
-        tipo = (
-            "certamen" if "certamen" in lower else
-            "examen" if "examen" in lower else
-            "control" if "control" in lower else
-            "tarea" if "tarea" in lower else
-            None
-        )
-        if not tipo:
-            continue
-
-        fecha_eval = _normalizar_fecha(fechas_linea[0])
-        if not fecha_eval:
-            continue
 
+    inicio_linea = 0
+    fecha_linea = None
+    tipos_linea = set()
+    pct_linea = None
+
+    def cerrar_linea(fin: int) -> None:
+        if fecha_linea is None or not tipos_linea:
+            return
+        fecha = _normalizar_fecha(fecha_linea)
+        if not fecha:
+            return
+        tipo = next(t for t in _PRECEDENCIA_TIPO if t in tipos_linea)
         ponderacion = None
-        m = re.search(r"(\d+(?:[.,]\d+)?)\s*%", linea)
-        if m:
+        if pct_linea is not None:
             try:
-                ponderacion = float(m.group(1).replace(",", ".")) / 100.0
+                ponderacion = float(pct_linea.replace(",", ".")) / 100.0
             except ValueError:
                 pass
-
         evaluaciones.append({
-            "nombre": linea.strip()[:50] or tipo,
-            "fecha": fecha_eval,
+            "nombre": texto[inicio_linea:fin].strip()[:50] or tipo,
+            "fecha": fecha,
             "tipo": tipo,
             "ponderacion": ponderacion
         })
 
-    return {"semestre": semestre, "evaluaciones": evaluaciones}
-
+    for m in _PATRON_PROGRAMA.finditer(texto):
+        grupo = m.lastgroup
+        if grupo == "fecha":
+            f = m.group("fecha")
+            dt = _parsear_fecha(f)
+            if dt is not None:
+                fechas.add(dt)
+            if fecha_linea is None:
+                fecha_linea = f
+        elif grupo == "tipo":
+            tipos_linea.add(m.group("tipo").lower())
+        elif grupo == "pct":
+            if pct_linea is None:
+                pct_linea = m.group("pct")
+        else:
+            cerrar_linea(m.start())
+            inicio_linea = m.end()
+            fecha_linea, pct_linea = None, None
+            tipos_linea = set()
+    cerrar_linea(len(texto))
 
-def _decode_base64_to_bytes(b64: str) -> bytes:
-    return base64.b64decode(b64)
-
-
-def extraer_texto_pdf_base64(b64: str) -> str:
-    if PyPDF2 is None:
-        return ""
-    try:
-        data = _decode_base64_to_bytes(b64)
-        reader = PyPDF2.PdfReader(io.BytesIO(data))
-        return "\n".join([(p.extract_text() or "").strip() for p in reader.pages if p])
-    except Exception:
-        return ""
-
-
-def ocr_imagen_base64(b64: str) -> str:
-    if Image is None or pytesseract is None:
-        return ""
-    try:
-        data = _decode_base64_to_bytes(b64)
-        img = Image.open(io.BytesIO(data))
-        return pytesseract.image_to_string(img).strip()
-    except Exception:
-        return ""
-
-
-def extraer_texto_de_entrada(entrada: Dict[str, Any]) -> str:
-    formato = (entrada.get("formato") or "").lower()
-    b64 = entrada.get("contenido_base64", "")
-    if not b64:
-        return ""
-
-    if formato == "texto":
-        try:
-            return _decode_base64_to_bytes(b64).decode("utf-8", errors="ignore").strip()
-        except Exception:
-            return ""
-    if formato == "pdf":
-        return extraer_texto_pdf_base64(b64)
-    if formato == "imagen":
-        return ocr_imagen_base64(b64)
+    semestre = {}
+    if len(fechas) >= 2:
+        semestre = {
+            "fecha_inicio": min(fechas).strftime("%d-%m-%Y"),
+            "fecha_fin": max(fechas).strftime("%d-%m-%Y"),
+        }
 
-    return ""
+    return {"semestre": semestre, "evaluaciones": evaluaciones}
 
 
-def _clasificar_entradas_auto(entradas: List[Dict[str, Any]], textos: List[str]) -> List[Dict[str, Any]]:
+def _clasificar_entradas_auto(
+    entradas: List[Dict[str, Any]],
+    tamanos: Optional[List[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Completa el tipo de las entradas sin tipo: es programa la que lo dice en
+    su nombre o, si ninguna, la más grande (según `tamanos`, o estimado sin
+    extraer el texto con tamano_entrada); el resto son apuntes.
+    """
     if not entradas:
         return entradas
 
@@ -233,7 +234,9 @@ def _clasificar_entradas_auto(entradas: List[Dict[str, Any]], textos: List[str])
             break
 
     if program_idx is None:
-        program_idx = max(range(len(textos)), key=lambda i: len(textos[i] or ""), default=0)
+        if tamanos is None:
+            tamanos = [tamano_entrada(e) for e in entradas]
+        program_idx = max(range(len(tamanos)), key=lambda i: tamanos[i], default=0)
 
     for i, e in enumerate(entradas):
         if not e.get("tipo"):
@@ -242,33 +245,15 @@ def _clasificar_entradas_auto(entradas: List[Dict[str, Any]], textos: List[str])
     return entradas
 
 
+def _seccion_de_entrada(entrada: Dict[str, Any]) -> str:
+    return "programa" if entrada.get("tipo") == "programa" else "apuntes"
+
+
 def intensidad_desde_estado_animo(estado: str) -> str:
     estado = (estado or "").lower()
     return "suave" if estado == "cansado" else "intensa" if estado == "motivado" else "normal"
 
 
-def _clasificar_estado_animo_desde_texto(texto: str) -> str:
-    if not texto or not texto.strip():
-        return "normal"
-
-    cliente = genai.Client(api_key=GENAI_KEY)
-    prompt = (
-        "Clasifica el siguiente texto en: cansado, normal, motivado. "
-        "Responde solo una palabra.\n"
-        f"Texto: {texto.strip()}"
-    )
-    try:
-        resp = cliente.models.generate_content(model=GEMINI_MODEL_RESUMEN, contents=prompt)
-        s = (resp.text or "").strip().lower()
-        if "cansado" in s:
-            return "cansado"
-        if "motivado" in s:
-            return "motivado"
-        return "normal"
-    except Exception:
-        return "normal"
-
-
 def validar_payload(payload: Dict[str, Any]) -> None:
     errores = []
     curso = payload.get("curso", {})
@@ -288,28 +273,6 @@ def validar_payload(payload: Dict[str, Any]) -> None:
         raise ValueError(" | ".join(errores))
 
 
-def _normalizar_prioridades(plan: Dict[str, Any]) -> Dict[str, Any]:
-    for semana in plan.get("semanas", []):
-        for sesion in semana.get("sesiones", []):
-            try:
-                p = int(sesion.get("prioridad", 1))
-            except (TypeError, ValueError):
-                p = 1
-            sesion["prioridad"] = max(1, min(3, p))
-    return plan
-
-
-def _normalizar_duraciones(plan: Dict[str, Any]) -> Dict[str, Any]:
-    for semana in plan.get("semanas", []):
-        for sesion in semana.get("sesiones", []):
-            try:
-                d = int(sesion.get("duracion_minutos", 60))
-            except (TypeError, ValueError):
-                d = 60
-            sesion["duracion_minutos"] = max(30, min(240, d))
-    return plan
-
-
 def _payload_para_prompt(payload: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "curso": payload.get("curso", {}),
@@ -323,9 +286,20 @@ def _payload_para_prompt(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _regla_esqueleto(payload: Dict[str, Any]) -> str:
+    if not payload.get("esqueleto"):
+        return ""
+    return (
+        "\n- \"esqueleto\" trae las sesiones ya calendarizadas como [fecha, inicio, fin, tipo]: "
+        "respeta esas fechas y horas; solo asigna títulos, temas y objetivos."
+    )
+
+
 def construir_prompt_plan(payload: Dict[str, Any]) -> str:
     esquema = _esquema_salida_textual()
     data = _payload_para_prompt(payload)
+    if payload.get("esqueleto"):
+        data["esqueleto"] = payload["esqueleto"]
 
     return f"""
 Eres un planificador académico experto.
@@ -341,45 +315,156 @@ Reglas:
 - Usa apuntes solo como refuerzo del programa.
 - Genera sesiones dentro de los bloques de disponibilidad.
 - Prioridad entre 1 y 3.
-- Si falta un dato, usa null o listas vacías.
+- Si falta un dato, usa null o listas vacías.{_regla_esqueleto(payload)}
 
 Datos de entrada (JSON):
 {json.dumps(data, ensure_ascii=False)}
 """.strip()
 
 
-def _llamar_modelo_con_reintentos(
+def _es_error_reintentable(e: Exception) -> bool:
+    msg = str(e).lower()
+    if isinstance(e, genai_errors.ClientError):
+        status = getattr(e, "status_code", None) or getattr(e, "code", None)
+        return status == 429 or "resource_exhausted" in msg
+    if isinstance(e, genai_errors.ServerError):
+        return getattr(e, "status_code", None) == 503 or "overloaded" in msg
+    return False
+
+
+def _segundos_de_espera_sugeridos(e: Exception):
+    # Los 429 de Gemini traen RetryInfo con "retryDelay": "17s"
+    m = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(e))
+    return float(m.group(1)) if m else None
+
+
+async def _llamar_modelo_con_reintentos_async(
     cliente: genai.Client,
     modelo: str,
     prompt: str,
     max_intentos: int = 2 if MODO_DEMO else 3,
     espera_inicial: float = 1.0 if MODO_DEMO else 2.0
 ):
+    """
+    Llama al modelo respetando su cuota (RPM/TPM) con el limitador compartido.
+    Si igual llega un 429/503, se frena el modelo entero por lo que pida el
+    servidor (o con backoff exponencial) y se reintenta.
+    """
+    limitador = obtener_limitador(modelo)
+    tokens = estimar_tokens(prompt)
     espera = espera_inicial
     for intento in range(1, max_intentos + 1):
+        await limitador.adquirir_async(tokens)
+        try:
+            return await cliente.aio.models.generate_content(model=modelo, contents=prompt)
+        except (genai_errors.ClientError, genai_errors.ServerError) as e:
+            if not _es_error_reintentable(e) or intento == max_intentos:
+                raise
+            limitador.penalizar(_segundos_de_espera_sugeridos(e) or espera)
+            espera *= 2
+
+
+def _obtener_cache_llm():
+    global _cache_llm
+    if _cache_llm is None and CACHE_LLM_MAX_ENTRADAS > 0:
         try:
-            return cliente.models.generate_content(model=modelo, contents=prompt)
-        except genai_errors.ClientError as e:
-            msg = str(e).lower()
-            status = getattr(e, "status_code", None) or getattr(e, "code", None)
-            if status == 429 or "resource_exhausted" in msg:
-                if intento == max_intentos:
-                    raise
-                time.sleep(espera)
-                espera *= 2
-                continue
-            raise
-        except genai_errors.ServerError as e:
-            msg = str(e).lower()
-            if getattr(e, "status_code", None) == 503 or "overloaded" in msg:
-                if intento == max_intentos:
-                    raise
-                time.sleep(espera)
-                espera *= 2
-                continue
-            raise
-
-def _resumir_texto(cliente: genai.Client, texto: str, etiqueta: str, max_chars: int = 1200) -> str:
+            _cache_llm = CacheSQLite(
+                CACHE_DB_PATH,
+                "cache_llm",
+                max_entradas=CACHE_LLM_MAX_ENTRADAS,
+                max_bytes=int(CACHE_LLM_MAX_MB * 1024 * 1024),
+                ttl_segundos=CACHE_LLM_TTL_HORAS * 3600,
+            )
+        except Exception:
+            _cache_llm = None
+    return _cache_llm
+
+
+def estadisticas_cache_llm() -> Dict[str, Any]:
+    cache = _obtener_cache_llm()
+    return cache.estadisticas() if cache else {}
+
+
+def _cache_llm_activo(usar_cache: bool = True):
+    return _obtener_cache_llm() if usar_cache and not CACHE_LLM_DESACTIVADO else None
+
+
+def _guardar_respuesta_llm(modelo: str, prompt: str, texto: str) -> None:
+    # Se guarda aunque se haya pedido usar_cache=False: una regeneración
+    # forzada reemplaza la respuesta vieja en vez de dejarla para la próxima
+    cache = _cache_llm_activo()
+    if cache and texto:
+        cache.set(clave_contenido(prompt.encode("utf-8"), modelo), texto)
+
+
+async def _generar_texto_async(
+    cliente: genai.Client,
+    modelo: str,
+    prompt: str,
+    usar_cache: bool = True,
+    guardar: bool = True,
+    **kwargs
+) -> str:
+    """
+    Texto de la respuesta del modelo. Un prompt idéntico para el mismo modelo
+    se responde desde el cache (salvo usar_cache=False o CACHE_LLM_DESACTIVADO);
+    con usar_cache=False no se lee, pero la respuesta nueva sí se guarda.
+    Con guardar=False quien llama decide si guardar, p.ej. después de validar.
+    """
+    cache = _cache_llm_activo(usar_cache)
+    if cache:
+        guardado = cache.get(clave_contenido(prompt.encode("utf-8"), modelo))
+        if guardado is not None:
+            return guardado
+
+    resp = await _llamar_modelo_con_reintentos_async(cliente, modelo, prompt, **kwargs)
+    texto = (resp.text or "").strip()
+    if guardar:
+        _guardar_respuesta_llm(modelo, prompt, texto)
+    return texto
+
+
+async def _clasificar_estado_animo_desde_texto_async(
+    cliente: genai.Client,
+    texto: str,
+    usar_cache: bool = True,
+) -> str:
+    if not texto or not texto.strip():
+        return "normal"
+
+    prompt = (
+        "Clasifica el siguiente texto en: cansado, normal, motivado. "
+        "Responde solo una palabra.\n"
+        f"Texto: {texto.strip()}"
+    )
+    try:
+        s = (await _generar_texto_async(
+            cliente, GEMINI_MODEL_RESUMEN, prompt, usar_cache=usar_cache, max_intentos=1
+        )).lower()
+        if "cansado" in s:
+            return "cansado"
+        if "motivado" in s:
+            return "motivado"
+        return "normal"
+    except Exception:
+        return "normal"
+
+
+def _clasificar_estado_animo_desde_texto(texto: str, usar_cache: bool = True) -> str:
+    if not texto or not texto.strip():
+        return "normal"
+    cliente = obtener_cliente()
+    return ejecutar(_clasificar_estado_animo_desde_texto_async(cliente, texto, usar_cache))
+
+
+async def _resumir_texto_async(
+    cliente: genai.Client,
+    texto: str,
+    etiqueta: str,
+    max_chars: int = 1200,
+    usar_cache: bool = True,
+    con_ia: bool = None,
+) -> str:
     if not texto:
         return ""
 
@@ -388,6 +473,10 @@ def _resumir_texto(cliente: genai.Client, texto: str, etiqueta: str, max_chars:
     if len(texto) <= umbral:
         return _recortar_texto(texto, max_chars)
 
+    # Por defecto se resume localmente; la IA solo si se pide (RESUMEN_CON_IA)
+    if not (RESUMEN_CON_IA if con_ia is None else con_ia):
+        return resumir_extractivo(texto, max_chars)
+
     prompt = (
         f"Resume el siguiente {etiqueta} en puntos clave muy concisos. "
         f"Prioriza: unidades/temas, orden sugerido, evaluaciones si aparecen "
@@ -397,45 +486,53 @@ def _resumir_texto(cliente: genai.Client, texto: str, etiqueta: str, max_chars:
         f"TEXTO:\n{texto}"
     )
     try:
-        resp = _llamar_modelo_con_reintentos(cliente, GEMINI_MODEL_RESUMEN, prompt)
-        return _recortar_texto((resp.text or "").strip(), max_chars)
+        resumen = await _generar_texto_async(cliente, GEMINI_MODEL_RESUMEN, prompt, usar_cache=usar_cache)
+        return _recortar_texto(resumen, max_chars)
     except Exception:
-        return _recortar_texto(texto, max_chars)
+        return resumir_extractivo(texto, max_chars)
 
 
-def llamar_gemini_para_plan(payload: Dict[str, Any]) -> PlanEstudio:
-    cliente = genai.Client(api_key=GENAI_KEY)
-    prompt = construir_prompt_plan(payload)
+def _resumir_texto(
+    cliente: genai.Client,
+    texto: str,
+    etiqueta: str,
+    max_chars: int = 1200,
+    usar_cache: bool = True,
+    con_ia: bool = None,
+) -> str:
+    return ejecutar(_resumir_texto_async(cliente, texto, etiqueta, max_chars, usar_cache, con_ia))
 
-    try:
-        resp = _llamar_modelo_con_reintentos(cliente, GEMINI_MODEL_PLAN, prompt)
-    except Exception:
-        data_demo = {
-            "curso": {
-                "nombre": payload.get("curso", {}).get("nombre", "Curso"),
-                "codigo": payload.get("curso", {}).get("codigo"),
-                "semestre": None
-            },
-            "configuracion": {
-                "fecha_inicio": payload.get("semestre", {}).get("fecha_inicio", "01-01-2026"),
-                "fecha_fin": payload.get("semestre", {}).get("fecha_fin", "01-06-2026"),
-                "zona_horaria": ZONA_HORARIA,
-                "intensidad": payload.get("intensidad", "normal")
-            },
-            "resumen": {"estrategia": "Plan demo de respaldo.", "riesgos": []},
-            "semanas": []
-        }
-        return PlanEstudio(**data_demo)
 
-    texto = (resp.text or "").strip()
+def _plan_desde_respuesta(respuesta: str) -> PlanEstudio:
+    texto = respuesta
     if texto.startswith("```"):
         texto = texto.strip("`").strip()
         if texto.lower().startswith("json"):
             texto = texto[4:].strip()
 
-    data = json.loads(texto)
-    data = _normalizar_prioridades(_normalizar_duraciones(data))
-    return PlanEstudio(**data)
+    # Duraciones y prioridades se acotan en los validadores de SesionPlan
+    return PlanEstudio.model_validate_json(texto)
+
+
+async def llamar_gemini_para_plan_async(payload: Dict[str, Any], cliente: genai.Client = None) -> PlanEstudio:
+    cliente = cliente or obtener_cliente()
+    prompt = construir_prompt_plan(payload)
+
+    usar_cache = payload.get("usar_cache", True)
+
+    try:
+        # Se guarda en cache solo si el JSON resulta válido
+        respuesta = await _generar_texto_async(cliente, GEMINI_MODEL_PLAN, prompt, usar_cache=usar_cache, guardar=False)
+    except Exception:
+        return generar_plan_local(payload)
+
+    plan = _plan_desde_respuesta(respuesta)
+    _guardar_respuesta_llm(GEMINI_MODEL_PLAN, prompt, respuesta)
+    return plan
+
+
+def llamar_gemini_para_plan(payload: Dict[str, Any]) -> PlanEstudio:
+    return ejecutar(llamar_gemini_para_plan_async(payload))
 
 
 def generar_plan_y_ics(payload: Dict[str, Any]):
@@ -444,19 +541,109 @@ def generar_plan_y_ics(payload: Dict[str, Any]):
     return plan, generar_ics_desde_plan(plan)
 
 
-def generar_plan_y_ics_multimodal(payload_entrada: Dict[str, Any]):
+def _semana_desde_json(texto: str):
+    try:
+        return SemanaPlan.model_validate_json(texto)
+    except Exception:
+        return None
+
+
+def _iterar_respuesta_plan(cliente: genai.Client, prompt: str, max_intentos: int = 2 if MODO_DEMO else 3):
+    """
+    Trozos de texto de la respuesta del modelo a medida que llegan.
+    Los 429/503 solo se reintentan antes del primer trozo; después ya no
+    se puede reanudar el stream sin duplicar lo entregado.
+    """
+    limitador = obtener_limitador(GEMINI_MODEL_PLAN)
+    tokens = estimar_tokens(prompt)
+    espera = 1.0 if MODO_DEMO else 2.0
+    for intento in range(1, max_intentos + 1):
+        limitador.adquirir(tokens)
+        recibido = False
+        try:
+            for trozo in cliente.models.generate_content_stream(model=GEMINI_MODEL_PLAN, contents=prompt):
+                if trozo.text:
+                    recibido = True
+                    yield trozo.text
+            return
+        except (genai_errors.ClientError, genai_errors.ServerError) as e:
+            if recibido or not _es_error_reintentable(e) or intento == max_intentos:
+                raise
+            limitador.penalizar(_segundos_de_espera_sugeridos(e) or espera)
+            espera *= 2
+
+
+def iterar_plan_gemini(payload: Dict[str, Any], cliente: genai.Client = None) -> Iterator[Tuple]:
+    """
+    Versión en streaming de llamar_gemini_para_plan.
+    Entrega ("semana", SemanaPlan) apenas el modelo termina de escribir cada
+    semana y al final ("plan", PlanEstudio) con el plan completo validado.
+    Una respuesta en cache se entrega igual, semana por semana.
+    """
+    cliente = cliente or obtener_cliente()
+    prompt = construir_prompt_plan(payload)
+    usar_cache = payload.get("usar_cache", True)
+
+    cache = _cache_llm_activo(usar_cache)
+    guardado = cache.get(clave_contenido(prompt.encode("utf-8"), GEMINI_MODEL_PLAN)) if cache else None
+    trozos = [guardado] if guardado is not None else _iterar_respuesta_plan(cliente, prompt)
+
+    parser = ParserSemanasIncremental()
+    try:
+        for trozo in trozos:
+            for texto_semana in parser.alimentar(trozo):
+                semana = _semana_desde_json(texto_semana)
+                if semana is not None:
+                    yield "semana", semana
+    except Exception:
+        if not parser.texto():
+            yield "plan", generar_plan_local(payload)
+            return
+        raise
+
+    respuesta = parser.texto().strip()
+    plan = _plan_desde_respuesta(respuesta)
+    if guardado is None:
+        _guardar_respuesta_llm(GEMINI_MODEL_PLAN, prompt, respuesta)
+    yield "plan", plan
+
+
+async def _preparar_payload_ia_async(payload_entrada: Dict[str, Any], cliente: genai.Client) -> Dict[str, Any]:
+    """
+    Todo lo que va antes de pedir el plan: extracción, recortes, fechas,
+    ánimo y resúmenes. Devuelve el payload que recibe el modelo de plan.
+    """
     validar_payload(payload_entrada)
     payload = dict(payload_entrada)
 
+    usar_cache = payload.get("usar_cache", True)
+
+    tarea_animo = None
     if payload.get("estado_animo_texto") and not payload.get("estado_animo"):
-        payload["estado_animo"] = _clasificar_estado_animo_desde_texto(payload["estado_animo_texto"])
+        tarea_animo = asyncio.create_task(
+            _clasificar_estado_animo_desde_texto_async(cliente, payload["estado_animo_texto"], usar_cache)
+        )
 
-    if not payload.get("intensidad"):
-        payload["intensidad"] = intensidad_desde_estado_animo(payload.get("estado_animo"))
+    curso = payload.get("curso", {})
+    disponibilidad = payload.get("disponibilidad", {})
+    fijos = {
+        "instrucciones": construir_prompt_plan({}),
+        "curso": curso,
+        "disponibilidad": disponibilidad,
+    }
 
+    # Primero se decide qué es programa y qué apuntes (por tamaño, sin
+    # extraer), para leer cada PDF solo hasta lo que después podría llegar
+    # al prompt desde su sección: los apuntes comparten una parte menor
     entradas = [dict(e) for e in (payload.get("entradas", []) or [])]
-    textos_todos = [extraer_texto_de_entrada(e) for e in entradas]
-    entradas = _clasificar_entradas_auto(entradas, textos_todos)
+    entradas = await asyncio.to_thread(_clasificar_entradas_auto, entradas)
+    secciones = {_seccion_de_entrada(e) for e in entradas}
+    if payload.get("evaluaciones_conocidas"):
+        secciones.add("evaluaciones")
+    max_material = caracteres_material(GEMINI_MODEL_PLAN, fijos, secciones)
+    textos_todos = await asyncio.to_thread(
+        extraer_textos_en_paralelo, entradas, presupuestos=[max_material[_seccion_de_entrada(e)] for e in entradas]
+    )
 
     textos_programa = [t for e, t in zip(entradas, textos_todos) if e.get("tipo") == "programa"]
     textos_apuntes = [t for e, t in zip(entradas, textos_todos) if e.get("tipo") != "programa"]
@@ -464,13 +651,8 @@ def generar_plan_y_ics_multimodal(payload_entrada: Dict[str, Any]):
     texto_programa = "\n\n".join([t for t in textos_programa if t])
     textos_apuntes = [t for t in textos_apuntes if t]
 
-    # Recortes (mas agresivos en demo)
-    if MODO_DEMO:
-        texto_programa = _recortar_texto(texto_programa, 2000)
-        textos_apuntes = _recortar_lista_textos(textos_apuntes, 1000, 2500)
-    else:
-        texto_programa = _recortar_texto(texto_programa, 4000)
-        textos_apuntes = _recortar_lista_textos(textos_apuntes, 2000, 6000)
+    texto_programa = _recortar_texto(texto_programa, max_material.get("programa", 0))
+    textos_apuntes = _recortar_lista_textos(textos_apuntes, max_material.get("apuntes", 0), max_material.get("apuntes", 0))
 
     info = extraer_info_programa(texto_programa)
     semestre = payload.get("semestre", {}) or {}
@@ -491,38 +673,120 @@ def generar_plan_y_ics_multimodal(payload_entrada: Dict[str, Any]):
     if not evaluaciones and info.get("evaluaciones"):
         evaluaciones = info["evaluaciones"]
 
-    cliente = genai.Client(api_key=GENAI_KEY)
+    # Sin intensidad dada, la del ánimo clasificado solo se sabe al final
+    intensidad_pendiente = tarea_animo is not None and not payload.get("intensidad")
+    if not intensidad_pendiente and not payload.get("intensidad"):
+        payload["intensidad"] = intensidad_desde_estado_animo(payload.get("estado_animo"))
+
+    payload_ia = {
+        "curso": curso,
+        "semestre": semestre,
+        "disponibilidad": disponibilidad,
+        "evaluaciones_conocidas": evaluaciones,
+        "texto_programa": "",
+        "textos_apuntes": [],
+        "usar_cache": usar_cache,
+    }
+
+    def esqueleto(intensidad: str) -> List[List[str]]:
+        return esqueleto_para_prompt(generar_plan_local(dict(payload_ia, intensidad=intensidad)))
+
+    if PLAN_ESQUELETO_LOCAL:
+        if not intensidad_pendiente:
+            fijos["esqueleto"] = esqueleto(payload.get("intensidad", "normal"))
+        else:
+            # Los resúmenes no esperan al ánimo: se presupuesta con el esqueleto
+            # más largo posible y el real (que cabe en ese espacio) se arma después
+            fijos["esqueleto"] = max((esqueleto(i) for i in get_args(Intensidad)), key=tokens_de)
+    fijos["semestre"] = semestre
+
+    reparto = repartir_presupuesto(GEMINI_MODEL_PLAN, fijos, {
+        "programa": tokens_de(texto_programa) if texto_programa else 0,
+        "apuntes": tokens_de("\n\n".join(textos_apuntes)) if textos_apuntes else 0,
+        "evaluaciones": tokens_de(evaluaciones) if evaluaciones else 0,
+    })
+    max_programa = caracteres_para(reparto["asignado"]["programa"])
+    max_apuntes = caracteres_para(reparto["asignado"]["apuntes"])
+    payload_ia["evaluaciones_conocidas"] = recortar_evaluaciones(evaluaciones, reparto["asignado"]["evaluaciones"])
+    payload_ia["presupuesto"] = reparto
+
+    # None = lo que diga RESUMEN_CON_IA
+    con_ia = payload.get("resumen_con_ia")
 
     # En demo: 1 solo resumen combinado = 1 llamada menos
     if MODO_DEMO:
         material = texto_programa + "\n\nAPUNTES:\n" + "\n\n".join(textos_apuntes)
-        resumen_total = _resumir_texto(cliente, material, "material del curso", max_chars=1200)
-
-        payload_ia = {
-            "curso": payload.get("curso", {}),
-            "semestre": semestre,
-            "disponibilidad": payload.get("disponibilidad", {}),
-            "evaluaciones_conocidas": evaluaciones,
-            "texto_programa": resumen_total or texto_programa,
-            "textos_apuntes": [],
-            "intensidad": payload.get("intensidad", "normal"),
-            "estado_animo": payload.get("estado_animo"),
-        }
+        resumenes = asyncio.gather(_resumir_texto_async(
+            cliente, material, "material del curso", max_chars=max_programa + max_apuntes,
+            usar_cache=usar_cache, con_ia=con_ia
+        ))
     else:
-        resumen_programa = _resumir_texto(cliente, texto_programa, "programa", max_chars=800)
-        resumen_apuntes = _resumir_texto(cliente, "\n\n".join(textos_apuntes), "apuntes", max_chars=800)
-
-        payload_ia = {
-            "curso": payload.get("curso", {}),
-            "semestre": semestre,
-            "disponibilidad": payload.get("disponibilidad", {}),
-            "evaluaciones_conocidas": evaluaciones,
-            "texto_programa": resumen_programa or texto_programa,
-            "textos_apuntes": [resumen_apuntes] if resumen_apuntes else textos_apuntes,
-            "intensidad": payload.get("intensidad", "normal"),
-            "estado_animo": payload.get("estado_animo"),
-        }
+        resumenes = asyncio.gather(
+            _resumir_texto_async(
+                cliente, texto_programa, "programa", max_chars=max_programa, usar_cache=usar_cache, con_ia=con_ia
+            ),
+            _resumir_texto_async(
+                cliente, "\n\n".join(textos_apuntes), "apuntes", max_chars=max_apuntes,
+                usar_cache=usar_cache, con_ia=con_ia
+            ),
+        )
+
+    # El ánimo se clasifica mientras corren los resúmenes
+    if tarea_animo is not None:
+        payload["estado_animo"] = await tarea_animo
+    if intensidad_pendiente:
+        payload["intensidad"] = intensidad_desde_estado_animo(payload.get("estado_animo"))
+        if PLAN_ESQUELETO_LOCAL:
+            fijos["esqueleto"] = esqueleto(payload["intensidad"])
+
+    payload_ia["intensidad"] = payload.get("intensidad", "normal")
+    payload_ia["estado_animo"] = payload.get("estado_animo")
+    if PLAN_ESQUELETO_LOCAL:
+        payload_ia["esqueleto"] = fijos["esqueleto"]
 
-    plan = llamar_gemini_para_plan(payload_ia)
+    if MODO_DEMO:
+        (resumen_total,) = await resumenes
+        payload_ia["texto_programa"] = resumen_total or _recortar_texto(texto_programa, max_programa)
+    else:
+        resumen_programa, resumen_apuntes = await resumenes
+        payload_ia["texto_programa"] = resumen_programa or _recortar_texto(texto_programa, max_programa)
+        payload_ia["textos_apuntes"] = (
+            [resumen_apuntes] if resumen_apuntes else _recortar_lista_textos(textos_apuntes, max_apuntes, max_apuntes)
+        )
+    return payload_ia
+
+
+async def generar_plan_y_ics_multimodal_async(payload_entrada: Dict[str, Any]):
+    """
+    Igual que generar_plan_y_ics_multimodal, pero las etapas independientes
+    corren a la vez: la clasificación del ánimo en paralelo con la extracción
+    y los resúmenes de programa/apuntes en paralelo entre sí. Solo el plan
+    espera a todo lo anterior.
+    """
+    cliente = obtener_cliente()
+    payload_ia = await _preparar_payload_ia_async(payload_entrada, cliente)
+    plan = await llamar_gemini_para_plan_async(payload_ia, cliente)
     ics_str = generar_ics_desde_plan(plan)
     return plan, ics_str
+
+
+def generar_plan_y_ics_multimodal(payload_entrada: Dict[str, Any]):
+    return ejecutar(generar_plan_y_ics_multimodal_async(payload_entrada))
+
+
+def iterar_plan_y_ics_multimodal(payload_entrada: Dict[str, Any]) -> Iterator[Tuple]:
+    """
+    Como generar_plan_y_ics_multimodal, pero muestra el plan mientras se
+    genera: primero ("borrador", PlanEstudio) con el plan local instantáneo,
+    luego ("semana", SemanaPlan) por cada semana que el modelo termina y al
+    final ("listo", plan, ics).
+    """
+    cliente = obtener_cliente()
+    payload_ia = ejecutar(_preparar_payload_ia_async(payload_entrada, cliente))
+    yield "borrador", generar_plan_local(payload_ia)
+    for evento in iterar_plan_gemini(payload_ia, cliente):
+        if evento[0] == "plan":
+            plan = evento[1]
+            yield "listo", plan, generar_ics_desde_plan(plan)
+        else:
+            yield evento
@@ -0,0 +1,231 @@
+import re
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .parametros import ZONA_HORARIA
+from .modelos import PlanEstudio
+
+DIAS_SEMANA = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "miércoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "sábado": 5, "domingo": 6,
+}
+
+# Fracción de cada bloque que se usa según la intensidad
+FACTOR_INTENSIDAD = {"suave": 0.6, "normal": 0.8, "intensa": 1.0}
+
+# Días de repaso antes de una evaluación: base + proporcional a su ponderación
+DIAS_REPASO_BASE = 3
+DIAS_REPASO_POR_PONDERACION = 14
+PONDERACION_POR_DEFECTO = 0.15
+
+TIPOS_EVALUACION = ("control", "tarea", "certamen", "examen", "otro")
+
+_PATRON_TEMA = re.compile(r"^\s*(?:unidad|tema|cap[ií]tulo|m[oó]dulo)\b.{0,80}", re.IGNORECASE | re.MULTILINE)
+
+
+def _fecha(s: str) -> Optional[date]:
+    try:
+        return datetime.strptime((s or "").strip(), "%d-%m-%Y").date()
+    except ValueError:
+        return None
+
+
+def _minutos(hora: str) -> Optional[int]:
+    try:
+        h, m = (hora or "").strip().split(":")[:2]
+        return int(h) * 60 + int(m)
+    except ValueError:
+        return None
+
+
+def _hora(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _bloques_por_dia(bloques: List[Dict[str, Any]]) -> Dict[int, List[Tuple[int, int]]]:
+    por_dia: Dict[int, List[Tuple[int, int]]] = {}
+    for b in bloques or []:
+        dia = DIAS_SEMANA.get((b.get("dia") or "").strip().lower())
+        inicio, fin = _minutos(b.get("inicio", "")), _minutos(b.get("fin", ""))
+        if dia is None or inicio is None or fin is None or fin <= inicio:
+            continue
+        por_dia.setdefault(dia, []).append((inicio, fin))
+    for lista in por_dia.values():
+        lista.sort()
+    return por_dia
+
+
+def _temas_desde_programa(texto: str, maximo: int = 30) -> List[str]:
+    temas = []
+    for m in _PATRON_TEMA.finditer(texto or ""):
+        tema = m.group(0).strip()
+        if tema and tema not in temas:
+            temas.append(tema)
+        if len(temas) >= maximo:
+            break
+    return temas
+
+
+def _ponderacion_valida(p) -> Optional[float]:
+    try:
+        p = float(p)
+    except (TypeError, ValueError):
+        return None
+    return p if 0 <= p <= 1 else None
+
+
+def _evaluaciones_ordenadas(evaluaciones: List[Dict[str, Any]]) -> List[Tuple[date, Dict[str, Any]]]:
+    out = []
+    for e in evaluaciones or []:
+        f = _fecha(e.get("fecha", ""))
+        if f is not None:
+            out.append((f, e))
+    out.sort(key=lambda x: x[0])
+    return out
+
+
+def _sesion_para(dia: date, evals: List[Tuple[date, Dict[str, Any]]], fechas_eval: List[date], n: int):
+    """(tipo, prioridad, evaluación objetivo o None) para una sesión en ese día."""
+    i = bisect_left(fechas_eval, dia)
+    if i < len(evals):
+        f_eval, ev = evals[i]
+        ponderacion = _ponderacion_valida(ev.get("ponderacion"))
+        if ponderacion is None:
+            ponderacion = PONDERACION_POR_DEFECTO
+        ventana = DIAS_REPASO_BASE + round(ponderacion * DIAS_REPASO_POR_PONDERACION)
+        faltan = (f_eval - dia).days
+        if faltan == 0:
+            return "evaluacion", 3, ev
+        if faltan <= ventana:
+            return "repaso", 3 if ponderacion >= 0.25 else 2, ev
+    return ("teoria" if n % 2 == 0 else "ejercicios"), 1, None
+
+
+def generar_plan_local(payload: Dict[str, Any]) -> PlanEstudio:
+    """
+    Plan determinista armado sin IA, en milisegundos.
+    Usa cada bloque de disponibilidad dentro del semestre (nunca se sale de
+    ellos), acorta las sesiones según la intensidad y convierte en repaso los
+    días previos a cada evaluación, con más anticipación mientras más pesa.
+    Los temas salen de las líneas "Unidad/Tema/Capítulo" del programa.
+    """
+    curso = payload.get("curso", {}) or {}
+    semestre = payload.get("semestre", {}) or {}
+    intensidad = payload.get("intensidad") or "normal"
+    factor = FACTOR_INTENSIDAD.get(intensidad, FACTOR_INTENSIDAD["normal"])
+
+    inicio = _fecha(semestre.get("fecha_inicio", "")) or date.today()
+    fin = _fecha(semestre.get("fecha_fin", "")) or inicio + timedelta(days=120)
+    if fin < inicio:
+        inicio, fin = fin, inicio
+
+    bloques = _bloques_por_dia((payload.get("disponibilidad", {}) or {}).get("bloques", []))
+    evals = _evaluaciones_ordenadas(payload.get("evaluaciones_conocidas", []))
+    fechas_eval = [f for f, _ in evals]
+    temas = _temas_desde_programa(payload.get("texto_programa", ""))
+
+    lunes = inicio - timedelta(days=inicio.weekday())
+    total_semanas = (fin - lunes).days // 7 + 1
+    semanas, n_sesiones, semanas_vacias = [], 0, 0
+
+    for k in range(total_semanas):
+        ini_sem = max(inicio, lunes + timedelta(days=7 * k))
+        fin_sem = min(fin, lunes + timedelta(days=7 * k + 6))
+        tema = temas[k * len(temas) // total_semanas] if temas else None
+
+        sesiones = []
+        dia = ini_sem
+        while dia <= fin_sem:
+            for b_ini, b_fin in bloques.get(dia.weekday(), []):
+                duracion = max(30, min(240, int((b_fin - b_ini) * factor)))
+                duracion = min(duracion, b_fin - b_ini)
+                tipo, prioridad, ev = _sesion_para(dia, evals, fechas_eval, n_sesiones)
+                if ev is not None:
+                    titulo = ("Evaluación: " if tipo == "evaluacion" else "Repaso para ") + ev.get("nombre", "evaluación")
+                    temas_sesion = [ev.get("nombre", "")]
+                else:
+                    titulo = f"{'Estudio' if tipo == 'teoria' else 'Ejercicios'}: {tema or curso.get('nombre', 'curso')}"
+                    temas_sesion = [tema] if tema else []
+                sesiones.append({
+                    "id": f"W{k + 1:02d}-S{len(sesiones) + 1:02d}",
+                    "titulo": titulo,
+                    "fecha": dia.strftime("%d-%m-%Y"),
+                    "inicio": _hora(b_ini),
+                    "fin": _hora(b_ini + duracion),
+                    "duracion_minutos": duracion,
+                    "tipo": tipo,
+                    "temas": temas_sesion,
+                    "output": None,
+                    "prioridad": prioridad,
+                })
+                n_sesiones += 1
+            dia += timedelta(days=1)
+
+        if not sesiones:
+            semanas_vacias += 1
+
+        # Evaluaciones de esta semana y de la siguiente
+        i, j = bisect_left(fechas_eval, ini_sem), bisect_left(fechas_eval, fin_sem + timedelta(days=8))
+        cercanas = [
+            {
+                "nombre": ev.get("nombre", "Evaluación"),
+                "fecha": f.strftime("%d-%m-%Y"),
+                "tipo": ev.get("tipo") if ev.get("tipo") in TIPOS_EVALUACION else "otro",
+                "ponderacion": _ponderacion_valida(ev.get("ponderacion")),
+            }
+            for f, ev in evals[i:j]
+        ]
+        objetivos = [f"Preparar {c['nombre']}" for c in cercanas] or ([f"Avanzar en {tema}"] if tema else [])
+
+        semanas.append({
+            "numero": k + 1,
+            "rango_fechas": {"inicio": ini_sem.strftime("%d-%m-%Y"), "fin": fin_sem.strftime("%d-%m-%Y")},
+            "objetivos": objetivos,
+            "contenidos": [tema] if tema else [],
+            "evaluaciones_cercanas": cercanas,
+            "sesiones": sesiones,
+        })
+
+    riesgos = []
+    if not bloques:
+        riesgos.append("No hay bloques de disponibilidad válidos.")
+    elif semanas_vacias:
+        riesgos.append(f"{semanas_vacias} semana(s) sin bloques de estudio.")
+    fuera = [ev.get("nombre", "") for f, ev in evals if f < inicio or f > fin]
+    if fuera:
+        riesgos.append("Evaluaciones fuera del semestre: " + ", ".join(fuera))
+
+    return PlanEstudio(**{
+        "curso": {
+            "nombre": curso.get("nombre", "Curso"),
+            "codigo": curso.get("codigo"),
+            "semestre": None,
+        },
+        "configuracion": {
+            "fecha_inicio": inicio.strftime("%d-%m-%Y"),
+            "fecha_fin": fin.strftime("%d-%m-%Y"),
+            "zona_horaria": ZONA_HORARIA,
+            "intensidad": intensidad if intensidad in FACTOR_INTENSIDAD else "normal",
+        },
+        "resumen": {
+            "estrategia": (
+                f"Plan local: {n_sesiones} sesiones en los bloques disponibles, "
+                f"con repaso antes de {len(evals)} evaluación(es)."
+            ),
+            "riesgos": riesgos,
+        },
+        "semanas": semanas,
+    })
+
+
+def esqueleto_para_prompt(plan: PlanEstudio) -> List[List[str]]:
+    """
+    Versión compacta del plan local para pedirle al modelo que solo lo
+    refine: [fecha, inicio, fin, tipo] por sesión.
+    """
+    return [
+        [s.fecha, s.inicio, s.fin, s.tipo]
+        for semana in plan.semanas
+        for s in semana.sesiones
+    ]
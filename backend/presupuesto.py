@@ -0,0 +1,100 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List
+
+from .limitador import estimar_tokens
+from .parametros import PRESUPUESTOS_PROMPT, PRESUPUESTO_PROMPT_POR_DEFECTO
+
+logger = logging.getLogger(__name__)
+
+CARACTERES_POR_TOKEN = 4
+
+# Cómo se reparte lo que queda después de las secciones fijas
+PESOS_SECCIONES = {"programa": 0.5, "apuntes": 0.35, "evaluaciones": 0.15}
+
+# Cuánto texto crudo (en múltiplos de lo asignado) se lee y entrega al
+# resumen, para que tenga de dónde elegir
+MARGEN_RESUMEN = 3
+
+
+def tokens_de(valor: Any) -> int:
+    """Tokens estimados de un texto o de un valor que va al prompt como JSON."""
+    if isinstance(valor, str):
+        return estimar_tokens(valor)
+    return estimar_tokens(json.dumps(valor, ensure_ascii=False))
+
+
+def caracteres_para(tokens: int) -> int:
+    return max(0, int(tokens)) * CARACTERES_POR_TOKEN
+
+
+def presupuesto_modelo(modelo: str) -> int:
+    return PRESUPUESTOS_PROMPT.get(modelo, PRESUPUESTO_PROMPT_POR_DEFECTO)
+
+
+def repartir_presupuesto(modelo: str, fijos: Dict[str, Any], demanda: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Reparte el presupuesto de tokens del prompt de un modelo.
+    Las secciones fijas (instrucciones/esquema, disponibilidad, ...) van
+    completas; el resto se reparte entre programa, apuntes y evaluaciones
+    según PESOS_SECCIONES. Lo que una sección no necesita (su demanda es
+    menor que su parte) pasa a las demás.
+    """
+    presupuesto = presupuesto_modelo(modelo)
+    tokens_fijos = {k: tokens_de(v) for k, v in fijos.items()}
+    restante = max(0, presupuesto - sum(tokens_fijos.values()))
+
+    asignado = {k: 0 for k in PESOS_SECCIONES}
+    pendientes = {k for k in PESOS_SECCIONES if demanda.get(k, 0) > 0}
+    while pendientes and restante > 0:
+        peso_total = sum(PESOS_SECCIONES[k] for k in pendientes)
+        parte = {k: int(restante * PESOS_SECCIONES[k] / peso_total) for k in pendientes}
+        saciadas = {k for k in pendientes if demanda[k] - asignado[k] <= parte[k]}
+        if not saciadas:
+            for k in pendientes:
+                asignado[k] += parte[k]
+            break
+        for k in saciadas:
+            restante -= demanda[k] - asignado[k]
+            asignado[k] = demanda[k]
+        pendientes -= saciadas
+
+    reparto = {
+        "modelo": modelo,
+        "presupuesto": presupuesto,
+        "fijos": tokens_fijos,
+        "demanda": {k: demanda.get(k, 0) for k in PESOS_SECCIONES},
+        "asignado": asignado,
+        "total": sum(tokens_fijos.values()) + sum(asignado.values()),
+    }
+    logger.info("Presupuesto de prompt: %s", json.dumps(reparto, ensure_ascii=False))
+    return reparto
+
+
+def caracteres_material(modelo: str, fijos: Dict[str, Any], secciones: Iterable[str]) -> Dict[str, int]:
+    """
+    Máximo de caracteres de material que conviene leer para cada sección
+    presente (p.ej. {"programa", "apuntes"}), con margen para el resumen.
+    Es la parte que le tocaría a la sección si todas las presentes pidieran
+    de más; lo de las ausentes se reparte. Sirve para no leer más de eso de
+    cada archivo antes de saber cuánto pide cada sección.
+    """
+    restante = max(0, presupuesto_modelo(modelo) - sum(tokens_de(v) for v in fijos.values()))
+    presentes = [s for s in PESOS_SECCIONES if s in set(secciones)]
+    peso_total = sum(PESOS_SECCIONES[s] for s in presentes)
+    return {
+        s: caracteres_para(restante * PESOS_SECCIONES[s] / peso_total) * MARGEN_RESUMEN
+        for s in presentes
+    }
+
+
+def recortar_evaluaciones(evaluaciones: List[Dict[str, Any]], tokens: int) -> List[Dict[str, Any]]:
+    """Las primeras evaluaciones que caben en tokens (van como JSON al prompt)."""
+    out, usados = [], 0
+    for ev in evaluaciones:
+        t = tokens_de(ev)
+        if usados + t > tokens:
+            break
+        out.append(ev)
+        usados += t
+    return out
@@ -1,14 +1,9 @@
-import base64
 import json
 from pathlib import Path
 
 from backend.planificador import generar_plan_y_ics_multimodal
 
 
-def _b64_file(path: Path) -> str:
-    return base64.b64encode(path.read_bytes()).decode("utf-8")
-
-
 def _pick_files(base_dir: Path):
     """
     Toma los ejemplos locales en la raíz del proyecto para armar el payload.
@@ -36,13 +31,13 @@ def main():
         "tipo": "programa",
         "formato": "pdf",
         "nombre": archivo_programa.name,
-        "contenido_base64": _b64_file(archivo_programa),
+        "ruta": str(archivo_programa),
     }
     entrada_apunte = {
         "tipo": "apunte",
         "formato": "pdf",
         "nombre": archivo_apunte.name,
-        "contenido_base64": _b64_file(archivo_apunte),
+        "ruta": str(archivo_apunte),
     }
 
     payload = {
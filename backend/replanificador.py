@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .modelos import PlanEstudio, SesionPlan, DiffPlan, CambioSesion
+from .planificador import intensidad_desde_estado_animo
+from .planificador_local import FACTOR_INTENSIDAD, generar_plan_local, _bloques_por_dia, _fecha, _hora, _minutos
+
+
+def _orden_sesion(s: SesionPlan):
+    return (_fecha(s.fecha) or date.max, s.inicio)
+
+
+def _bloque_que_contiene(bloques_dia: List[Tuple[int, int]], inicio: int, fin: int) -> Optional[Tuple[int, int]]:
+    for b_ini, b_fin in bloques_dia:
+        if b_ini <= inicio and fin <= b_fin:
+            return b_ini, b_fin
+    return None
+
+
+def diff_planes(antes: PlanEstudio, despues: PlanEstudio, desde: str = "") -> DiffPlan:
+    """Sesiones agregadas, eliminadas o modificadas entre dos versiones del plan (por id)."""
+    viejas = {s.id: (sem.numero, s) for sem in antes.semanas for s in sem.sesiones}
+    nuevas = {s.id: (sem.numero, s) for sem in despues.semanas for s in sem.sesiones}
+
+    cambios = []
+    for id_, (semana, s) in viejas.items():
+        if id_ not in nuevas:
+            cambios.append(CambioSesion(semana=semana, accion="eliminada", id=id_, antes=s))
+        elif nuevas[id_][1] != s:
+            cambios.append(CambioSesion(semana=nuevas[id_][0], accion="modificada", id=id_, antes=s, despues=nuevas[id_][1]))
+    for id_, (semana, s) in nuevas.items():
+        if id_ not in viejas:
+            cambios.append(CambioSesion(semana=semana, accion="agregada", id=id_, despues=s))
+
+    cambios.sort(key=lambda c: (c.semana, c.id))
+    return DiffPlan(
+        desde=desde,
+        semanas_afectadas=sorted({c.semana for c in cambios}),
+        cambios=cambios,
+    )
+
+
+def replanificar_por_animo(
+    plan: PlanEstudio,
+    estado_animo: str,
+    bloques: Optional[List[Dict[str, Any]]] = None,
+    hoy: Optional[date] = None,
+) -> Tuple[PlanEstudio, DiffPlan]:
+    """
+    El ánimo es del día: solo se ajustan las sesiones de hoy al domingo.
+    Cada una se alarga o acorta según la intensidad que corresponde al
+    ánimo, sin salirse de su bloque (si no se conocen los bloques, solo se
+    acorta). Títulos, temas y el resto del plan no cambian.
+    Se escala siempre desde la duración planificada (duracion_base), así que
+    repetir el mismo ánimo no cambia nada y volver al ánimo con que se
+    generó el plan deja las duraciones originales.
+    """
+    hoy = hoy or date.today()
+    domingo = hoy + timedelta(days=6 - hoy.weekday())
+    factor_plan = FACTOR_INTENSIDAD.get(plan.configuracion.intensidad, FACTOR_INTENSIDAD["normal"])
+    factor_nuevo = FACTOR_INTENSIDAD[intensidad_desde_estado_animo(estado_animo)]
+    por_dia = _bloques_por_dia(bloques) if bloques else None
+
+    nuevo = plan.model_copy(deep=True)
+    for semana in nuevo.semanas:
+        for s in semana.sesiones:
+            f = _fecha(s.fecha)
+            inicio = _minutos(s.inicio)
+            if f is None or inicio is None or not (hoy <= f <= domingo):
+                continue
+            base = s.duracion_base or s.duracion_minutos
+            duracion = max(30, min(240, round(base * factor_nuevo / factor_plan)))
+            if por_dia is None:
+                duracion = min(duracion, base)
+            else:
+                bloque = _bloque_que_contiene(por_dia.get(f.weekday(), []), inicio, inicio + base)
+                if bloque is not None:
+                    duracion = min(duracion, bloque[1] - inicio)
+            s.duracion_minutos = duracion
+            s.duracion_base = base if duracion != base else None
+            s.fin = _hora(inicio + duracion)
+
+    return nuevo, diff_planes(plan, nuevo, hoy.strftime("%d-%m-%Y"))
+
+
+def replanificar_por_disponibilidad(
+    plan: PlanEstudio,
+    bloques: List[Dict[str, Any]],
+    hoy: Optional[date] = None,
+) -> Tuple[PlanEstudio, DiffPlan]:
+    """
+    Recalcula solo las sesiones desde hoy con los bloques nuevos.
+    Las que siguen cabiendo en un bloque se quedan como están. Las que ya
+    no caben se mueven a los horarios libres de la misma semana que propone
+    el planificador local (conservando título y temas). Si sobran se
+    eliminan; si faltan, se agregan sesiones nuevas del plan local.
+    """
+    hoy = hoy or date.today()
+    por_dia = _bloques_por_dia(bloques)
+    fin_semestre = _fecha(plan.configuracion.fecha_fin) or hoy
+
+    evaluaciones = {}
+    for semana in plan.semanas:
+        for ev in semana.evaluaciones_cercanas:
+            evaluaciones[(ev.nombre, ev.fecha)] = ev.model_dump()
+
+    local = generar_plan_local({
+        "curso": plan.curso.model_dump(),
+        "semestre": {
+            "fecha_inicio": max(hoy, _fecha(plan.configuracion.fecha_inicio) or hoy).strftime("%d-%m-%Y"),
+            "fecha_fin": fin_semestre.strftime("%d-%m-%Y"),
+        },
+        "disponibilidad": {"bloques": bloques},
+        "evaluaciones_conocidas": list(evaluaciones.values()),
+        "intensidad": plan.configuracion.intensidad,
+    })
+    huecos_por_fecha: Dict[date, List[SesionPlan]] = {}
+    for semana in local.semanas:
+        for s in semana.sesiones:
+            huecos_por_fecha.setdefault(_fecha(s.fecha), []).append(s)
+
+    nuevo = plan.model_copy(deep=True)
+    for semana in nuevo.semanas:
+        ini_sem = _fecha(semana.rango_fechas.inicio)
+        fin_sem = _fecha(semana.rango_fechas.fin)
+        if ini_sem is None or fin_sem is None or fin_sem < hoy:
+            continue
+
+        quedan, sueltas = [], []
+        for s in semana.sesiones:
+            f, inicio = _fecha(s.fecha), _minutos(s.inicio)
+            if f is None or f < hoy or inicio is None:
+                quedan.append(s)
+            elif _bloque_que_contiene(por_dia.get(f.weekday(), []), inicio, inicio + s.duracion_minutos):
+                quedan.append(s)
+            else:
+                sueltas.append(s)
+
+        ocupados: Dict[str, List[Tuple[int, int]]] = {}
+        for s in quedan:
+            inicio = _minutos(s.inicio)
+            if inicio is not None:
+                ocupados.setdefault(s.fecha, []).append((inicio, inicio + s.duracion_minutos))
+        siguiente = max((int(s.id.rsplit("S", 1)[-1]) for s in semana.sesiones if s.id.rsplit("S", 1)[-1].isdigit()), default=0)
+        dia = max(ini_sem, hoy)
+        while dia <= fin_sem:
+            for hueco in huecos_por_fecha.get(dia, []):
+                h_ini = _minutos(hueco.inicio)
+                h_fin = h_ini + hueco.duracion_minutos
+                if any(h_ini < o_fin and o_ini < h_fin for o_ini, o_fin in ocupados.get(hueco.fecha, [])):
+                    continue
+                if sueltas:
+                    s = sueltas.pop(0)
+                    s.fecha, s.inicio, s.fin, s.duracion_minutos = hueco.fecha, hueco.inicio, hueco.fin, hueco.duracion_minutos
+                    s.duracion_base = None
+                else:
+                    siguiente += 1
+                    s = hueco.model_copy(update={"id": f"W{semana.numero:02d}-S{siguiente:02d}"})
+                quedan.append(s)
+            dia += timedelta(days=1)
+
+        quedan.sort(key=_orden_sesion)
+        semana.sesiones = quedan
+
+    return nuevo, diff_planes(plan, nuevo, hoy.strftime("%d-%m-%Y"))
+
+
+def replanificar(plan: PlanEstudio, evento: Dict[str, Any], hoy: Optional[date] = None) -> Tuple[PlanEstudio, DiffPlan]:
+    """
+    Re-planificación incremental y local (sin llamar al modelo).
+    evento: {"tipo": "estado_animo", "estado_animo": "cansado", "bloques": [...]}
+         o  {"tipo": "disponibilidad", "bloques": [...]}
+    Devuelve el plan nuevo y sus diferencias con el anterior.
+    """
+    tipo = evento.get("tipo")
+    if tipo == "estado_animo":
+        return replanificar_por_animo(plan, evento.get("estado_animo"), evento.get("bloques"), hoy)
+    if tipo == "disponibilidad":
+        return replanificar_por_disponibilidad(plan, evento.get("bloques", []), hoy)
+    raise ValueError(f"Evento de re-planificación desconocido: {tipo}")
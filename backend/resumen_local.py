@@ -0,0 +1,106 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+_PATRON_ORACION = re.compile(r"(?<=[.!?;])\s+|\n+")
+_PATRON_PALABRA = re.compile(r"[a-záéíóúñü]{3,}")
+# Día y mes tienen que ser válidos: "10-20" no es una fecha
+_DIA = r"(?:0?[1-9]|[12]\d|3[01])"
+_MES = r"(?:0?[1-9]|1[0-2])"
+_PATRON_FECHA = re.compile(
+    rf"\b(?:{_DIA}[/-]{_MES}(?P<anio>[/-]\d{{2,4}})?|\d{{4}}[/-]{_MES}[/-]{_DIA})\b"
+)
+# Un rango de páginas ("págs. 10-12", "pp 3-4") tampoco, si no trae año
+_PATRON_PAGINAS = re.compile(r"\b(?:p[aá]g(?:ina)?s?|pp)\.?\s*$", re.IGNORECASE)
+_PATRON_ESTRUCTURA = re.compile(r"\b(unidad|tema|cap[ií]tulo|m[oó]dulo|semana|contenidos?)\b", re.IGNORECASE)
+_PATRON_EVALUACION = re.compile(
+    r"\b(certamen|examen|control|tarea|interrogaci[oó]n|prueba|proyecto|entrega|evaluaci[oó]n)\b|%",
+    re.IGNORECASE,
+)
+
+_STOPWORDS = frozenset("""
+con del las los una uno unos unas por para que como pero sus este esta estos estas ese esa eso
+entre sobre sin desde hasta cada todo toda todos todas muy más mas son ser fue han hay será
+the and for with from that this are was were you your not can will its also
+""".split())
+
+# Cuánto suma cada señal al puntaje de una oración
+PESO_FECHA = 1.0
+PESO_ESTRUCTURA = 0.6
+PESO_EVALUACION = 1.0
+
+
+def _oraciones(texto: str, max_largo: int = 400) -> List[str]:
+    out = []
+    for o in _PATRON_ORACION.split(texto or ""):
+        o = " ".join(o.split())
+        if len(o) < 4:
+            continue
+        # Párrafos sin puntuación: se cortan para que no se coman el presupuesto
+        while len(o) > max_largo:
+            corte = o.rfind(" ", 0, max_largo)
+            corte = corte if corte > 0 else max_largo
+            out.append(o[:corte])
+            o = o[corte:].strip()
+        if o:
+            out.append(o)
+    return out
+
+
+def _tiene_fecha(oracion: str) -> bool:
+    for m in _PATRON_FECHA.finditer(oracion):
+        if m.group("anio") or not _PATRON_PAGINAS.search(oracion, 0, m.start()):
+            return True
+    return False
+
+
+def _palabras(oracion: str) -> List[str]:
+    return [p for p in _PATRON_PALABRA.findall(oracion.lower()) if p not in _STOPWORDS]
+
+
+def resumir_extractivo(texto: str, max_chars: int = 1200) -> str:
+    """
+    Resumen extractivo sin IA: elige las oraciones con más peso TF-IDF,
+    favoreciendo las que mencionan unidades/temas, fechas o evaluaciones,
+    y las devuelve en su orden original sin pasar de max_chars.
+    """
+    if not texto or max_chars <= 0:
+        return ""
+    if len(texto) <= max_chars:
+        return texto
+
+    oraciones = list(dict.fromkeys(_oraciones(texto)))
+    if not oraciones:
+        return texto[:max_chars]
+
+    palabras = [_palabras(o) for o in oraciones]
+    df = Counter(p for ps in palabras for p in set(ps))
+    tf_doc = Counter(p for ps in palabras for p in ps)
+    n = len(oraciones)
+    peso = {p: (1 + math.log(tf_doc[p])) * math.log(1 + n / df[p]) for p in df}
+
+    puntajes = []
+    for i, (o, ps) in enumerate(zip(oraciones, palabras)):
+        unicas = set(ps)
+        base = sum(peso[p] for p in unicas) / len(unicas) if unicas else 0.0
+        bono = 1.0
+        if _tiene_fecha(o):
+            bono += PESO_FECHA
+        if _PATRON_ESTRUCTURA.search(o):
+            bono += PESO_ESTRUCTURA
+        if _PATRON_EVALUACION.search(o):
+            bono += PESO_EVALUACION
+        puntajes.append((base * bono, i))
+
+    elegidas, usados = [], 0
+    for _, i in sorted(puntajes, reverse=True):
+        largo = len(oraciones[i]) + (1 if elegidas else 0)
+        if usados + largo > max_chars:
+            continue
+        elegidas.append(i)
+        usados += largo
+        if max_chars - usados < 20:
+            break
+
+    return "\n".join(oraciones[i] for i in sorted(elegidas))
@@ -0,0 +1,120 @@
+"""
+Benchmark de la generación del calendario .ics con miles de eventos.
+Compara la versión anterior (lista de líneas + join, strptime y
+datetime.now() por evento) con escribir_ics, que escribe el archivo por
+trozos. Mide tiempo y memoria máxima (tracemalloc).
+
+    python -m benchmarks.bench_ics [--eventos 1000 5000 20000] [--repeticiones 3]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.gen_calendar import _dt_ical, escribir_ics
+from backend.modelos import PlanEstudio
+from backend.parametros import ZONA_HORARIA
+from benchmarks.cliente_falso import plan_falso
+
+SESIONES_POR_SEMANA = 5
+
+
+def _dt_ical_anterior(fecha: str, hora: str) -> str:
+    fecha = (fecha or "").strip()
+    hora = (hora or "").strip() or "00:00"
+    for f_fmt in ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"]:
+        for h_fmt in ["%H:%M", "%H:%M:%S"]:
+            try:
+                dt = datetime.strptime(f"{fecha} {hora}", f"{f_fmt} {h_fmt}")
+                return dt.strftime("%d%m%YT%H%M%S")
+            except ValueError:
+                continue
+    raise ValueError(f"Formato de fecha no soportado: {fecha} {hora}")
+
+
+def generar_ics_anterior(plan: PlanEstudio) -> str:
+    lineas = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Organizador Academico IA//ES//",
+        "CALSCALE:GREGORIAN"
+    ]
+    uid_contador = 0
+    for semana in plan.semanas:
+        for sesion in semana.sesiones:
+            uid_contador += 1
+            dtstart = _dt_ical_anterior(sesion.fecha, sesion.inicio)
+            dtend = _dt_ical_anterior(sesion.fecha, sesion.fin)
+            resumen = sesion.titulo or "Sesion de estudio"
+            descripcion = ""
+            if sesion.temas:
+                descripcion += "Temas: " + ", ".join(sesion.temas) + "\\n"
+            if sesion.output:
+                descripcion += "Objetivo: " + sesion.output
+            uid = sesion.id or f"W{semana.numero:02d}-S{uid_contador:02d}"
+            lineas.extend([
+                "BEGIN:VEVENT",
+                f"UID:{uid}@organizador-ia",
+                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%S')}",
+                f"DTSTART;TZID={ZONA_HORARIA}:{dtstart}",
+                f"DTEND;TZID={ZONA_HORARIA}:{dtend}",
+                f"SUMMARY:{resumen}",
+                f"DESCRIPTION:{descripcion}",
+                "END:VEVENT"
+            ])
+    lineas.append("END:VCALENDAR")
+    return "\n".join(lineas)
+
+
+def _anterior_a_archivo(plan, ruta):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(generar_ics_anterior(plan))
+
+
+def _nuevo_a_archivo(plan, ruta):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escribir_ics([plan], f)
+
+
+def _medir(fn, plan, ruta, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        _dt_ical.cache_clear()
+        t0 = time.perf_counter()
+        fn(plan, ruta)
+        tiempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(plan, ruta)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--eventos", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'eventos':>8} {'anterior ms':>12} {'nuevo ms':>9} {'anterior KiB':>13} {'nuevo KiB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "plan.ics")
+        for n in args.eventos:
+            semanas = max(1, n // SESIONES_POR_SEMANA)
+            plan = PlanEstudio.model_validate(json.loads(plan_falso(semanas, SESIONES_POR_SEMANA)))
+            t_ant, m_ant = _medir(_anterior_a_archivo, plan, ruta, args.repeticiones)
+            t_nuevo, m_nuevo = _medir(_nuevo_a_archivo, plan, ruta, args.repeticiones)
+            print(f"{n:>8} {t_ant * 1000:>12.1f} {t_nuevo * 1000:>9.1f} {m_ant / 1024:>13.0f} {m_nuevo / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
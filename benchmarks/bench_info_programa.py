@@ -0,0 +1,126 @@
+"""
+Benchmark de extraer_info_programa sobre programas sintéticos de ~1 MB.
+Compara contra la versión anterior (regex sin compilar por línea y
+strptime repetido) y verifica que ambas entreguen lo mismo en este programa,
+donde ningún porcentaje va pegado a una fecha. En general no son idénticas:
+la anterior tomaba el porcentaje de los dígitos de una fecha ("2026-04-05,
+30%" daba 0.053); la actual lo lee después de la fecha (0.3).
+
+    python -m benchmarks.bench_info_programa [--mb 1] [--repeticiones 5]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.planificador import extraer_info_programa, _parsear_fecha, _normalizar_fecha
+
+_LINEAS = [
+    "Unidad {n}: contenidos de la semana y lecturas recomendadas.",
+    "Clase {n} ({d}-{m}-2026): ejercicios de aplicación.",
+    "Certamen {n} el {d}/{m}/2026, ponderación {p}%.",
+    "Control {n} - {d}-{m}-26 ({p},5 %)",
+    "Tarea {n}: entrega 2026-{m}-{d}",
+    "Examen final {d}-{m}-2026 {p}%",
+    "Bibliografía: capítulo {n}, páginas 10-20.",
+    "Horario de consultas martes y jueves.",
+]
+
+
+def programa_sintetico(n_bytes: int, semilla: int = 0) -> str:
+    rnd = random.Random(semilla)
+    partes, total = [], 0
+    while total < n_bytes:
+        linea = rnd.choice(_LINEAS).format(
+            n=rnd.randint(1, 15), d=rnd.randint(1, 28), m=rnd.randint(3, 7), p=rnd.randint(5, 40)
+        )
+        partes.append(linea)
+        total += len(linea) + 1
+    return "\n".join(partes)
+
+
+def _normalizar_fecha_original(fecha_str):
+    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%y", "%d/%m/%y"):
+        try:
+            return datetime.strptime(fecha_str, fmt).strftime("%d-%m-%Y")
+        except ValueError:
+            pass
+    return ""
+
+
+def extraer_info_programa_original(texto):
+    fechas_raw = re.findall(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b", texto or "")
+    fechas = [f for f in (_normalizar_fecha_original(f) for f in fechas_raw) if f]
+    fechas_unique = sorted(set(fechas), key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
+    semestre = {}
+    if len(fechas_unique) >= 2:
+        semestre = {"fecha_inicio": fechas_unique[0], "fecha_fin": fechas_unique[-1]}
+
+    evaluaciones = []
+    for linea in (texto or "").splitlines():
+        lower = linea.lower()
+        fechas_linea = re.findall(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b", linea)
+        if not fechas_linea:
+            continue
+        tipo = (
+            "certamen" if "certamen" in lower else
+            "examen" if "examen" in lower else
+            "control" if "control" in lower else
+            "tarea" if "tarea" in lower else
+            None
+        )
+        if not tipo:
+            continue
+        fecha_eval = _normalizar_fecha_original(fechas_linea[0])
+        if not fecha_eval:
+            continue
+        ponderacion = None
+        m = re.search(r"(\d+(?:[.,]\d+)?)\s*%", linea)
+        if m:
+            ponderacion = float(m.group(1).replace(",", ".")) / 100.0
+        evaluaciones.append({"nombre": linea.strip()[:50] or tipo, "fecha": fecha_eval, "tipo": tipo, "ponderacion": ponderacion})
+    return {"semestre": semestre, "evaluaciones": evaluaciones}
+
+
+def _medir(fn, texto, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(texto)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=1.0)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    texto = programa_sintetico(int(args.mb * 1024 * 1024))
+    esperado = extraer_info_programa_original(texto)
+    obtenido = extraer_info_programa(texto)
+    if esperado != obtenido:
+        raise SystemExit("Los resultados no coinciden con la versión anterior en el programa sintético")
+
+    t_original = _medir(extraer_info_programa_original, texto, args.repeticiones)
+    _parsear_fecha.cache_clear()
+    _normalizar_fecha.cache_clear()
+    t_frio = _medir(extraer_info_programa, texto, 1)
+    t_nuevo = _medir(extraer_info_programa, texto, args.repeticiones)
+
+    print(f"texto: {len(texto) / 1024 / 1024:.2f} MB, {len(obtenido['evaluaciones'])} evaluaciones")
+    print(f"original:           {t_original * 1000:8.1f} ms")
+    print(f"una pasada (frío):  {t_frio * 1000:8.1f} ms")
+    print(f"una pasada:         {t_nuevo * 1000:8.1f} ms  (x{t_original / t_nuevo:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Benchmark de punta a punta del pipeline de backend/planificador.py con un
+cliente de Gemini falso (benchmarks/cliente_falso.py): extracción de PDF,
+construcción del prompt, validación de la respuesta, generación del ICS y
+el camino multimodal completo (normal y en streaming), para varios tamaños
+de entrada. Escribe los resultados en JSON para comparar entre versiones.
+
+    python -m benchmarks.bench_pipeline [--tamanos chico mediano grande] [--repeticiones 5]
+        [--latencia 0] [--salida benchmarks/resultados/pipeline.json]
+        [--comparar resultados_anteriores.json] [--umbral 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+# Sin caches ni limitador de cuota: se mide el trabajo, no los aciertos de
+# cache ni las esperas por RPM. Se pueden pisar desde el entorno.
+for _var, _valor in {
+    "CACHE_EXTRACCION_MAX_ENTRADAS": "0",
+    "CACHE_LLM_DESACTIVADO": "1",
+    "GEMINI_RPM_RESUMEN": "1000000000",
+    "GEMINI_TPM_RESUMEN": "1000000000",
+    "GEMINI_RPM_PLAN": "1000000000",
+    "GEMINI_TPM_PLAN": "1000000000",
+}.items():
+    os.environ.setdefault(_var, _valor)
+
+from backend.asincronia import ejecutar
+from backend.cliente_gemini import configurar_fabrica_cliente, obtener_cliente
+from backend.extraccion import extraer_textos_en_paralelo
+from backend.gen_calendar import generar_ics_desde_plan
+from backend.planificador import (
+    _plan_desde_respuesta,
+    _preparar_payload_ia_async,
+    construir_prompt_plan,
+    generar_plan_y_ics_multimodal,
+    iterar_plan_y_ics_multimodal,
+)
+from benchmarks.cliente_falso import ClienteFalso
+
+# nombre: (páginas del programa en PDF, semanas del plan)
+TAMANOS = {
+    "chico": (4, 8),
+    "mediano": (20, 16),
+    "grande": (80, 32),
+}
+SESIONES_POR_SEMANA = 3
+
+_LINEAS = [
+    "Unidad {n}: contenidos de la semana y lecturas recomendadas.",
+    "Clase {n} ({d}-{m}-2026): ejercicios de aplicacion.",
+    "Certamen {n} el {d}/{m}/2026, ponderacion {p}%.",
+    "Tarea {n}: entrega 2026-{m}-{d}",
+    "Bibliografia: capitulo {n}, paginas 10-20.",
+    "Horario de consultas martes y jueves.",
+]
+
+
+def pdf_sintetico(paginas: int, lineas_por_pagina: int = 50, semilla: int = 0) -> bytes:
+    """PDF mínimo (una fuente base, texto plano) con un programa de curso inventado."""
+    rnd = random.Random(semilla)
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    hijos = " ".join(f"{3 + 2 * i} 0 R" for i in range(paginas))
+    objetos.append(f"<< /Type /Pages /Kids [{hijos}] /Count {paginas} >>")
+    fuente = 3 + 2 * paginas
+    for _ in range(paginas):
+        lineas = [
+            rnd.choice(_LINEAS).format(
+                n=rnd.randint(1, 15), d=rnd.randint(1, 28), m=rnd.randint(3, 7), p=rnd.randint(5, 40)
+            )
+            for _ in range(lineas_por_pagina)
+        ]
+        contenido = "BT /F1 9 Tf 20 800 Td 11 TL " + " ".join(f"({l}) '" for l in lineas) + " ET"
+        objetos.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Contents {len(objetos) + 2} 0 R /Resources << /Font << /F1 {fuente} 0 R >> >> >>"
+        )
+        objetos.append(f"<< /Length {len(contenido)} >>\nstream\n{contenido}\nendstream")
+    objetos.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objetos, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for o in offsets:
+        out += f"{o:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def payload_sintetico(paginas: int) -> dict:
+    return {
+        "curso": {"nombre": "Curso de prueba", "codigo": "BENCH100"},
+        "semestre": {"fecha_inicio": "02-03-2026", "fecha_fin": "30-06-2026"},
+        "disponibilidad": {
+            "zona_horaria": "America/Santiago",
+            "bloques": [
+                {"dia": d, "inicio": "19:00", "fin": "21:00"} for d in ("lunes", "miercoles", "viernes")
+            ],
+        },
+        "evaluaciones_conocidas": [],
+        "estado_animo": "normal",
+        "entradas": [
+            {"tipo": "programa", "formato": "pdf", "nombre": "programa.pdf", "contenido": pdf_sintetico(paginas)},
+        ],
+    }
+
+
+def _medir(fn, repeticiones: int) -> dict:
+    fn()  # calentamiento: pools de procesos, loop de fondo, imports perezosos
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return {
+        "min_ms": round(min(tiempos), 3),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+    }
+
+
+def _primera_semana(payload: dict) -> None:
+    for evento in iterar_plan_y_ics_multimodal(payload):
+        if evento[0] == "semana":
+            return
+
+
+def medir_tamano(nombre: str, paginas: int, semanas: int, repeticiones: int, latencia: float) -> list:
+    configurar_fabrica_cliente(
+        lambda: ClienteFalso(latencia_s=latencia, semanas=semanas, sesiones_por_semana=SESIONES_POR_SEMANA)
+    )
+    cliente = obtener_cliente()
+    payload = payload_sintetico(paginas)
+    payload_ia = ejecutar(_preparar_payload_ia_async(payload, cliente))
+    plan = _plan_desde_respuesta(cliente.plan)
+
+    # Si el modelo "falla", el pipeline cae al plan local y se mediría otra cosa
+    plan_completo, _ = generar_plan_y_ics_multimodal(payload)
+    if len(plan_completo.semanas) != semanas:
+        raise SystemExit(f"{nombre}: el plan no vino del cliente falso ({len(plan_completo.semanas)} semanas)")
+
+    etapas = {
+        "extraccion": lambda: extraer_textos_en_paralelo(payload["entradas"]),
+        "prompt": lambda: construir_prompt_plan(payload_ia),
+        "validacion": lambda: _plan_desde_respuesta(cliente.plan),
+        "ics": lambda: generar_ics_desde_plan(plan),
+        "multimodal": lambda: generar_plan_y_ics_multimodal(payload),
+        "multimodal_primera_semana": lambda: _primera_semana(payload),
+    }
+    resultados = []
+    for etapa, fn in etapas.items():
+        resultados.append({
+            "etapa": etapa,
+            "tamano": nombre,
+            "paginas": paginas,
+            "semanas": semanas,
+            "sesiones": semanas * SESIONES_POR_SEMANA,
+            "repeticiones": repeticiones,
+            **_medir(fn, repeticiones),
+        })
+    return resultados
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def comparar(resultados: list, anterior_path: Path, umbral: float) -> int:
+    """Imprime la razón nuevo/anterior por etapa y devuelve cuántas empeoraron más que `umbral`."""
+    anteriores = {
+        (r["etapa"], r["tamano"]): r for r in json.loads(anterior_path.read_text(encoding="utf-8"))["resultados"]
+    }
+    regresiones = 0
+    print(f"\nComparación con {anterior_path} (mediana nueva / anterior):")
+    for r in resultados:
+        previo = anteriores.get((r["etapa"], r["tamano"]))
+        if not previo or not previo["mediana_ms"]:
+            continue
+        razon = r["mediana_ms"] / previo["mediana_ms"]
+        marca = ""
+        if razon > umbral:
+            regresiones += 1
+            marca = "  <- regresión"
+        print(f"{r['etapa']:>26} {r['tamano']:>8} {razon:>6.2f}x{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tamanos", nargs="+", choices=list(TAMANOS), default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por respuesta del modelo falso")
+    parser.add_argument("--salida", type=Path, default=ROOT / "benchmarks" / "resultados" / "pipeline.json")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    parser.add_argument("--umbral", type=float, default=1.25, help="razón nueva/anterior que cuenta como regresión")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'etapa':>26} {'tamaño':>8} {'min ms':>10} {'mediana ms':>11}")
+    try:
+        for nombre in args.tamanos:
+            paginas, semanas = TAMANOS[nombre]
+            for r in medir_tamano(nombre, paginas, semanas, args.repeticiones, args.latencia):
+                resultados.append(r)
+                print(f"{r['etapa']:>26} {nombre:>8} {r['min_ms']:>10.2f} {r['mediana_ms']:>11.2f}")
+    finally:
+        configurar_fabrica_cliente(None)
+
+    salida = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "latencia_s": args.latencia,
+            "repeticiones": args.repeticiones,
+        },
+        "resultados": resultados,
+    }
+    args.salida.parent.mkdir(parents=True, exist_ok=True)
+    args.salida.write_text(json.dumps(salida, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados en {args.salida}")
+
+    if args.comparar and comparar(resultados, args.comparar, args.umbral):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de PlanCompacto (backend/plan_compacto.py) frente a PlanEstudio
+para un historial de varios planes: memoria por sesión (tracemalloc),
+tiempo de conversión en ambos sentidos y filtrado por rango de fechas
+(recorrer los modelos leyendo cada fecha vs búsqueda binaria).
+
+    python -m benchmarks.bench_plan_compacto [--planes 1 10 50] [--semanas 16]
+        [--sesiones-por-semana 5] [--repeticiones 3]
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.modelos import PlanEstudio
+from backend.plan_compacto import PlanCompacto
+from benchmarks.cliente_falso import plan_falso
+
+
+def _memoria(fn):
+    """(resultado, bytes que siguen vivos después de fn)."""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = fn()
+    gc.collect()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, despues - antes
+
+
+def _tiempo(fn, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def _filtrar_modelos(planes, desde, hasta):
+    return [
+        s
+        for p in planes
+        for w in p.semanas
+        for s in w.sesiones
+        if desde <= datetime.strptime(s.fecha, "%d-%m-%Y").date() <= hasta
+    ]
+
+
+def _filtrar_compactos(compactos, desde, hasta):
+    return [s for c in compactos for s in c.iterar_entre(desde, hasta)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--planes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--semanas", type=int, default=16)
+    parser.add_argument("--sesiones-por-semana", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    crudo = json.loads(plan_falso(args.semanas, args.sesiones_por_semana))
+    # Una semana cualquiera del medio del semestre
+    primera = datetime.strptime(crudo["semanas"][0]["sesiones"][0]["fecha"], "%d-%m-%Y").date()
+    desde = primera + timedelta(weeks=args.semanas // 2)
+    hasta = desde + timedelta(days=6)
+
+    # Calentamiento: caches de pydantic y de strptime fuera de la medición
+    PlanCompacto.desde_plan(PlanEstudio.model_validate(crudo)).a_plan()
+
+    print(
+        f"{'planes':>6} {'sesiones':>8} {'modelo B/s':>10} {'compacto B/s':>12} {'x':>5} "
+        f"{'a compacto ms':>13} {'a modelo ms':>11} {'filtro modelo ms':>16} {'filtro compacto ms':>18}"
+    )
+    for n in args.planes:
+        planes, m_modelo = _memoria(lambda: [PlanEstudio.model_validate(crudo) for _ in range(n)])
+        compactos, m_compacto = _memoria(lambda: [PlanCompacto.desde_plan(p) for p in planes])
+        sesiones = sum(len(c) for c in compactos)
+
+        t_a_compacto = _tiempo(lambda: [PlanCompacto.desde_plan(p) for p in planes], args.repeticiones)
+        t_a_modelo = _tiempo(lambda: [c.a_plan() for c in compactos], args.repeticiones)
+        t_f_modelo = _tiempo(lambda: _filtrar_modelos(planes, desde, hasta), args.repeticiones)
+        t_f_compacto = _tiempo(lambda: _filtrar_compactos(compactos, desde, hasta), args.repeticiones)
+        assert len(_filtrar_modelos(planes, desde, hasta)) == len(_filtrar_compactos(compactos, desde, hasta))
+
+        print(
+            f"{n:>6} {sesiones:>8} {m_modelo / sesiones:>10.0f} {m_compacto / sesiones:>12.0f} "
+            f"{m_modelo / m_compacto:>5.1f} {t_a_compacto * 1000:>13.1f} {t_a_modelo * 1000:>11.1f} "
+            f"{t_f_modelo * 1000:>16.2f} {t_f_compacto * 1000:>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de la validación de la respuesta del modelo de plan.
+Compara el camino anterior (json.loads + dos recorridos de normalización
++ PlanEstudio(**data)) con PlanEstudio.model_validate_json y sus
+validadores, sobre planes con cientos de sesiones.
+
+    python -m benchmarks.bench_validacion_plan [--sesiones 100 500 2000] [--repeticiones 50]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.modelos import PlanEstudio
+from backend.planificador import _plan_desde_respuesta
+
+
+def plan_sintetico(n_sesiones: int, por_semana: int = 5, semilla: int = 0) -> str:
+    rnd = random.Random(semilla)
+    semanas = []
+    for w in range(0, n_sesiones, por_semana):
+        sesiones = [
+            {
+                "id": f"W{w // por_semana + 1:02d}-S{i + 1:02d}",
+                "titulo": "Sesión de estudio",
+                "fecha": "02-03-2026",
+                "inicio": "19:00",
+                "fin": "21:00",
+                # Valores fuera de rango o como texto, como a veces llegan del modelo
+                "duracion_minutos": rnd.choice([90, 500, 10, "120", None]),
+                "tipo": "teoria",
+                "temas": ["a", "b"],
+                "output": "resumen",
+                "prioridad": rnd.choice([1, 2, 7, "3", None]),
+            }
+            for i in range(min(por_semana, n_sesiones - w))
+        ]
+        semanas.append({
+            "numero": w // por_semana + 1,
+            "rango_fechas": {"inicio": "02-03-2026", "fin": "08-03-2026"},
+            "objetivos": ["x"],
+            "contenidos": ["y"],
+            "evaluaciones_cercanas": [],
+            "sesiones": sesiones,
+        })
+    return "```json\n" + json.dumps({
+        "curso": {"nombre": "Curso"},
+        "configuracion": {"fecha_inicio": "02-03-2026", "fecha_fin": "30-06-2026"},
+        "resumen": {"estrategia": "", "riesgos": []},
+        "semanas": semanas,
+    }) + "\n```"
+
+
+def _normalizar(plan):
+    for semana in plan.get("semanas", []):
+        for sesion in semana.get("sesiones", []):
+            try:
+                d = int(sesion.get("duracion_minutos", 60))
+            except (TypeError, ValueError):
+                d = 60
+            sesion["duracion_minutos"] = max(30, min(240, d))
+    for semana in plan.get("semanas", []):
+        for sesion in semana.get("sesiones", []):
+            try:
+                p = int(sesion.get("prioridad", 1))
+            except (TypeError, ValueError):
+                p = 1
+            sesion["prioridad"] = max(1, min(3, p))
+    return plan
+
+
+def plan_desde_respuesta_anterior(respuesta: str) -> PlanEstudio:
+    texto = respuesta
+    if texto.startswith("```"):
+        texto = texto.strip("`").strip()
+        if texto.lower().startswith("json"):
+            texto = texto[4:].strip()
+    return PlanEstudio(**_normalizar(json.loads(texto)))
+
+
+def _medir(fn, texto, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(texto)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'sesiones':>8} {'anterior ms':>12} {'validate_json ms':>17} {'x':>5}")
+    for n in args.sesiones:
+        texto = plan_sintetico(n)
+        if plan_desde_respuesta_anterior(texto) != _plan_desde_respuesta(texto):
+            raise SystemExit(f"Resultados distintos con {n} sesiones")
+        t_ant = _medir(plan_desde_respuesta_anterior, texto, args.repeticiones)
+        t_nuevo = _medir(_plan_desde_respuesta, texto, args.repeticiones)
+        print(f"{n:>8} {t_ant * 1000:>12.2f} {t_nuevo * 1000:>17.2f} {t_ant / t_nuevo:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
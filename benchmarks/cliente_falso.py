@@ -0,0 +1,125 @@
+"""
+Reemplazo local y determinista de genai.Client para los benchmarks.
+Responde con la misma forma que el SDK (objetos con .text) y simula la
+latencia de red; el plan que devuelve tiene el tamaño que se pida.
+
+    from backend.cliente_gemini import configurar_fabrica_cliente
+    configurar_fabrica_cliente(lambda: ClienteFalso(latencia_s=0.2, semanas=16))
+"""
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+
+
+class _Respuesta:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def plan_falso(semanas: int = 16, sesiones_por_semana: int = 3, inicio: date = date(2026, 3, 2)) -> str:
+    """JSON de un plan válido con semanas x sesiones_por_semana sesiones."""
+    lista = []
+    for w in range(semanas):
+        lunes = inicio + timedelta(weeks=w)
+        sesiones = [
+            {
+                "id": f"W{w + 1:02d}-S{i + 1:02d}",
+                "titulo": f"Unidad {w + 1}: sesión {i + 1}",
+                "fecha": (lunes + timedelta(days=2 * i % 7)).strftime("%d-%m-%Y"),
+                "inicio": "19:00",
+                "fin": "21:00",
+                "duracion_minutos": 120,
+                "tipo": ("teoria", "ejercicios", "repaso")[i % 3],
+                "temas": [f"Tema {w + 1}.{i + 1}", "Ejercicios; lecturas, guía"],
+                "output": "Resumen de una página",
+                "prioridad": 1 + i % 3,
+            }
+            for i in range(sesiones_por_semana)
+        ]
+        lista.append({
+            "numero": w + 1,
+            "rango_fechas": {
+                "inicio": lunes.strftime("%d-%m-%Y"),
+                "fin": (lunes + timedelta(days=6)).strftime("%d-%m-%Y"),
+            },
+            "objetivos": [f"Dominar la unidad {w + 1}"],
+            "contenidos": [f"Unidad {w + 1}"],
+            "evaluaciones_cercanas": [],
+            "sesiones": sesiones,
+        })
+    fin = inicio + timedelta(weeks=semanas)
+    return json.dumps({
+        "curso": {"nombre": "Curso de prueba", "codigo": "BENCH100"},
+        "configuracion": {"fecha_inicio": inicio.strftime("%d-%m-%Y"), "fecha_fin": fin.strftime("%d-%m-%Y")},
+        "resumen": {"estrategia": "Avanzar una unidad por semana", "riesgos": []},
+        "semanas": lista,
+    }, ensure_ascii=False)
+
+
+class _Modelos:
+    def __init__(self, cliente: "ClienteFalso"):
+        self._c = cliente
+
+    def generate_content(self, model, contents, **kwargs):
+        time.sleep(self._c.latencia_s)
+        return _Respuesta(self._c.responder(contents))
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        texto = self._c.responder(contents)
+        pausa = self._c.latencia_s / max(1, len(texto) // self._c.trozo)
+        time.sleep(self._c.latencia_s)
+        for i in range(0, len(texto), self._c.trozo):
+            time.sleep(pausa)
+            yield _Respuesta(texto[i:i + self._c.trozo])
+
+    def get(self, model, **kwargs):
+        return {"name": model}
+
+
+class _ModelosAsync:
+    def __init__(self, cliente: "ClienteFalso"):
+        self._c = cliente
+
+    async def generate_content(self, model, contents, **kwargs):
+        await asyncio.sleep(self._c.latencia_s)
+        return _Respuesta(self._c.responder(contents))
+
+
+class _Aio:
+    def __init__(self, cliente: "ClienteFalso"):
+        self.models = _ModelosAsync(cliente)
+
+    async def aclose(self):
+        pass
+
+
+class ClienteFalso:
+    """
+    latencia_s: espera antes de cada respuesta (en streaming, además se
+    reparte otra latencia_s entre los trozos).
+    semanas / sesiones_por_semana: tamaño del plan que devuelve.
+    trozo: caracteres por trozo en generate_content_stream.
+    """
+
+    def __init__(self, latencia_s: float = 0.0, semanas: int = 16, sesiones_por_semana: int = 3,
+                 trozo: int = 512, largo_resumen: int = 800):
+        self.latencia_s = latencia_s
+        self.trozo = max(1, trozo)
+        self.largo_resumen = largo_resumen
+        self.plan = plan_falso(semanas, sesiones_por_semana)
+        self.llamadas = 0
+        self.models = _Modelos(self)
+        self.aio = _Aio(self)
+
+    def responder(self, prompt: str) -> str:
+        self.llamadas += 1
+        if prompt.startswith("Clasifica"):
+            return "normal"
+        if prompt.lstrip().startswith("Resume"):
+            # Un "resumen" del largo pedido, armado con el mismo texto
+            return prompt[-self.largo_resumen:]
+        return self.plan
+
+    def close(self):
+        pass
@@ -0,0 +1,81 @@
+import io
+import time
+
+import pytest
+
+from backend import extraccion, ocr
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("PyPDF2")
+
+
+def _jpeg(texto: str) -> bytes:
+    from PIL import ImageDraw
+
+    imagen = Image.new("RGB", (400, 120), "white")
+    ImageDraw.Draw(imagen).text((20, 50), texto, fill="black")
+    salida = io.BytesIO()
+    imagen.save(salida, format="JPEG")
+    return salida.getvalue()
+
+
+def _pdf_escaneado(imagenes):
+    """PDF de una página sin capa de texto, con varias imágenes JPEG (como un escaneo)."""
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>", "<< /Type /Pages /Kids [3 0 R] /Count 1 >>"]
+    recursos = " ".join(f"/Im{i} {4 + i} 0 R" for i in range(len(imagenes)))
+    dibujo = "".join(f"q 400 0 0 120 0 {i * 130} cm /Im{i} Do Q\n" for i in range(len(imagenes))).encode()
+    objetos.append(
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 400 {130 * len(imagenes)}] "
+        f"/Resources << /XObject << {recursos} >> >> /Contents {4 + len(imagenes)} 0 R >>"
+    )
+    flujos = [
+        (f"<< /Type /XObject /Subtype /Image /Width 400 /Height 120 /ColorSpace /DeviceRGB "
+         f"/BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>", jpeg)
+        for jpeg in imagenes
+    ]
+    flujos.append((f"<< /Length {len(dibujo)} >>", dibujo))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objetos, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    for i, (dic, datos) in enumerate(flujos, start=len(objetos) + 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{dic}\nstream\n".encode() + datos + b"\nendstream\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode()
+    for o in offsets:
+        out += f"{o:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def _ocr_en_worker():
+    return ocr._obtener_pool().submit(sum, [1, 2]).result(timeout=10)
+
+
+def test_worker_no_hereda_el_pool_de_ocr():
+    # El pool de hilos de OCR ya se usó en este proceso antes de crear los workers
+    assert ocr._obtener_pool().submit(sum, [1, 2]).result() == 3
+    extraccion.cerrar_pool_extraccion(esperar=True)
+
+    assert extraccion._obtener_pool(2).submit(_ocr_en_worker).result(timeout=30) == 3
+
+
+def test_pdf_escaneado_en_el_pool_despues_de_ocr_en_el_padre(monkeypatch):
+    imagenes = [_jpeg("CERTAMEN 1"), _jpeg("CONTROL 2")]
+    ocr.ocr_varias(imagenes)
+    extraccion.cerrar_pool_extraccion(esperar=True)
+    monkeypatch.setattr(extraccion, "_obtener_cache_extraccion", lambda: None)
+
+    pdf = _pdf_escaneado(imagenes)
+    entradas = [{"formato": "pdf", "contenido": pdf}, {"formato": "pdf", "contenido": pdf}]
+    timeout = 30
+    t0 = time.monotonic()
+    textos = extraccion.extraer_textos_en_paralelo(entradas, max_workers=2, timeout=timeout)
+
+    # Un worker con el pool de OCR heredado se cuelga hasta el timeout de la etapa
+    assert time.monotonic() - t0 < timeout / 2
+    if ocr.ocr_disponible() and ocr.ocr_imagen(Image.open(io.BytesIO(imagenes[0]))):
+        assert all("CERTAMEN" in t.upper() for t in textos)
@@ -0,0 +1,18 @@
+from backend.planificador import extraer_info_programa
+
+
+def test_porcentaje_despues_de_una_fecha_no_sale_de_sus_digitos():
+    # La versión anterior leía "05,30%" desde los dígitos de la fecha (0.053)
+    evaluacion, = extraer_info_programa("tarea,2026-04-05,30%")["evaluaciones"]
+
+    assert evaluacion["tipo"] == "tarea"
+    assert evaluacion["fecha"] == "05-04-2026"
+    assert evaluacion["ponderacion"] == 0.3
+
+
+def test_porcentaje_no_cruza_de_linea():
+    info = extraer_info_programa("Certamen 1 el 15/04/2026 26\n %\nControl 2 20-05-2026 10%")
+
+    assert [e["tipo"] for e in info["evaluaciones"]] == ["certamen", "control"]
+    assert info["evaluaciones"][0]["ponderacion"] is None
+    assert info["evaluaciones"][1]["ponderacion"] == 0.1
@@ -0,0 +1,34 @@
+import random
+
+from backend.resumen_local import _tiene_fecha, resumir_extractivo
+
+
+def test_rango_de_paginas_no_es_fecha():
+    assert not _tiene_fecha("Bibliografia: capitulo 3, paginas 10-20.")
+    assert not _tiene_fecha("Lectura: capitulo 2, págs. 10-12.")
+    assert _tiene_fecha("Certamen 1 el 15/04")
+    assert _tiene_fecha("Clase 3 (12-04-2026): ejercicios")
+    assert _tiene_fecha("Tarea 2: entrega 2026-05-03")
+
+
+def test_bibliografia_no_entra_al_resumen_por_su_rango_de_paginas():
+    # Programa como el de benchmarks/bench_pipeline.py
+    plantillas = [
+        "Unidad {n}: contenidos de la semana y lecturas recomendadas.",
+        "Clase {n} ({d}-{m}-2026): ejercicios de aplicacion.",
+        "Certamen {n} el {d}/{m}/2026, ponderacion {p}%.",
+        "Tarea {n}: entrega 2026-{m}-{d}",
+        "Bibliografia: capitulo {n}, paginas 10-20.",
+        "Horario de consultas martes y jueves.",
+    ]
+    rnd = random.Random(0)
+    lineas = []
+    while sum(map(len, lineas)) < 20000:
+        lineas.append(rnd.choice(plantillas).format(
+            n=rnd.randint(1, 15), d=rnd.randint(1, 28), m=rnd.randint(3, 7), p=rnd.randint(5, 40)
+        ))
+
+    resumen = resumir_extractivo("\n".join(lineas), max_chars=2000)
+
+    assert "Certamen" in resumen
+    assert "Bibliografia" not in resumen